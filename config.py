@@ -6,8 +6,88 @@
 """
 
 import os
+import sys
+import copy
 import json
-from typing import Dict, Any, Optional
+from functools import cached_property
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 平台判断在导入时计算一次
+_IS_LINUX = sys.platform.startswith('linux')
+_IS_WIN32 = sys.platform == 'win32'
+
+# 环境变量映射表: (环境变量名, 配置路径, 类型转换函数)
+_ENV_MAP = [
+    ('MINIO_ENDPOINT', ('minio', 'endpoint'), str),
+    ('MINIO_ACCESS_KEY', ('minio', 'access_key'), str),
+    ('MINIO_SECRET_KEY', ('minio', 'secret_key'), str),
+    ('MINIO_SECURE', ('minio', 'secure'), lambda v: v.lower() == 'true'),
+    ('MINIO_BUCKET_NAME', ('minio', 'bucket_name'), str),
+    ('PDF_API_URL', ('pdf_api_url',), str),
+    ('PDF_PARSE_MODE', ('pdf_parse_mode',), str),
+    ('PDF_TO_IMAGE_DPI', ('pdf_to_image_dpi',), int),
+    ('POPPLER_PATH', ('poppler_path',), str),
+    ('TEMP_DIR', ('temp_dir',), str),
+    ('OUTPUT_BASE_DIR', ('output', 'base_directory'), str),
+    ('LOCAL_BASE_PATH', ('local', 'base_path'), str),
+]
+
+# 已解析配置文件缓存: {绝对路径: (mtime, 配置字典)}
+_FILE_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """序列化为带缩进的UTF-8 JSON，优先使用orjson"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """解析UTF-8 JSON，优先使用orjson"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def _build_default_config() -> Dict[str, Any]:
+    """构建默认配置"""
+    default_config = {
+        "minio": {
+            "endpoint": "localhost:9000",
+            "access_key": "",
+            "secret_key": "",
+            "secure": False,
+            "bucket_name": "report",
+            "base_prefix": "核心网络部运维报告"
+        },
+        "local": {
+            "base_path": "核心网络部运维报告"
+        },
+        "output": {
+            "base_directory": "核心网络部运维报告",
+            "create_date_folder": True,
+            "date_format": "%Y%m%d",
+            "upload_to_minio": True,
+            "minio_upload_path": "核心网络部运维报告/输出"
+        },
+        "pdf_api_url": "http://187.9.9.8:7434/v2/parse/file",
+        "pdf_parse_mode": "api",
+        "pdf_to_image_dpi": 200,
+        "temp_dir": "./tmp/minio_files"
+    }
+    
+    # 只在Windows系统上设置默认poppler_path
+    if _IS_WIN32:
+        default_config["poppler_path"] = "D:/poppler-25.07.0/Library/bin"
+    
+    return default_config
 
 
 class Config:
@@ -15,53 +95,24 @@ class Config:
     
     def __init__(self, config_file: str = "config.json"):
         self.config_file = config_file
-        self.config = self.load_config()
+    
+    @cached_property
+    def config(self) -> Dict[str, Any]:
+        """配置字典，首次访问时才加载"""
+        return self.load_config()
     
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
-        default_config = {
-            "minio": {
-                "endpoint": "localhost:9000",
-                "access_key": "",
-                "secret_key": "",
-                "secure": False,
-                "bucket_name": "report",
-                "base_prefix": "核心网络部运维报告"
-            },
-            "local": {
-                "base_path": "核心网络部运维报告"
-            },
-            "output": {
-                "base_directory": "核心网络部运维报告",
-                "create_date_folder": True,
-                "date_format": "%Y%m%d",
-                "upload_to_minio": True,
-                "minio_upload_path": "核心网络部运维报告/输出"
-            },
-            "pdf_api_url": "http://187.9.9.8:7434/v2/parse/file",
-            "pdf_parse_mode": "api",
-            "pdf_to_image_dpi": 200,
-            "temp_dir": "./tmp/minio_files"
-        }
-        
-        # 只在Windows系统上设置默认poppler_path
-        import sys
-        if sys.platform == 'win32':
-            default_config["poppler_path"] = "D:/poppler-25.07.0/Library/bin"
+        default_config = _build_default_config()
         
         # 如果配置文件存在，加载配置
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    file_config = json.load(f)
-                    # 合并默认配置和文件配置
-                    default_config.update(file_config)
+                file_config = self._read_config_file()
+                # 合并默认配置和文件配置，嵌套字典中未配置的项保留默认值
+                self._deep_update(default_config, file_config)
             except Exception as e:
                 print(f"加载配置文件失败: {e}，使用默认配置")
-        else:
-            # 创建默认配置文件
-            self.save_config(default_config)
-            print(f"已创建默认配置文件: {self.config_file}")
         
         # 从环境变量覆盖配置
         env_config = self.load_env_config()
@@ -70,57 +121,54 @@ class Config:
         
         return default_config
     
+    def _read_config_file(self) -> Dict[str, Any]:
+        """读取配置文件，文件未修改时复用已解析的结果"""
+        key = os.path.abspath(self.config_file)
+        mtime = os.stat(key).st_mtime
+        cached = _FILE_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            return copy.deepcopy(cached[1])
+        
+        with open(key, 'rb') as f:
+            file_config = _json_loads(f.read())
+        _FILE_CACHE[key] = (mtime, file_config)
+        return copy.deepcopy(file_config)
+    
+    def ensure_default_file(self):
+        """配置文件不存在时创建默认配置文件"""
+        if not os.path.exists(self.config_file):
+            self.save_config(_build_default_config())
+            print(f"已创建默认配置文件: {self.config_file}")
+    
     def load_env_config(self) -> Dict[str, Any]:
         """从环境变量加载配置"""
         env_config = {}
+        env = os.environ
         
-        # Minio配置
-        minio_config = {}
-        if os.getenv('MINIO_ENDPOINT'):
-            minio_config['endpoint'] = os.getenv('MINIO_ENDPOINT')
-        if os.getenv('MINIO_ACCESS_KEY'):
-            minio_config['access_key'] = os.getenv('MINIO_ACCESS_KEY')
-        if os.getenv('MINIO_SECRET_KEY'):
-            minio_config['secret_key'] = os.getenv('MINIO_SECRET_KEY')
-        if os.getenv('MINIO_SECURE'):
-            minio_config['secure'] = os.getenv('MINIO_SECURE').lower() == 'true'
-        if os.getenv('MINIO_BUCKET_NAME'):
-            minio_config['bucket_name'] = os.getenv('MINIO_BUCKET_NAME')
-        
-        if minio_config:
-            env_config['minio'] = minio_config
-        
-        # 其他配置
-        if os.getenv('PDF_API_URL'):
-            env_config['pdf_api_url'] = os.getenv('PDF_API_URL')
-        if os.getenv('PDF_PARSE_MODE'):
-            env_config['pdf_parse_mode'] = os.getenv('PDF_PARSE_MODE')
-        if os.getenv('PDF_TO_IMAGE_DPI'):
+        for env_name, config_path, converter in _ENV_MAP:
+            value = env.get(env_name)
+            if not value:
+                continue
             try:
-                env_config['pdf_to_image_dpi'] = int(os.getenv('PDF_TO_IMAGE_DPI'))
+                value = converter(value)
             except ValueError:
-                pass
-        if os.getenv('POPPLER_PATH'):
-            env_config['poppler_path'] = os.getenv('POPPLER_PATH')
-        if os.getenv('TEMP_DIR'):
-            env_config['temp_dir'] = os.getenv('TEMP_DIR')
-        if os.getenv('OUTPUT_BASE_DIR'):
-            if 'output' not in env_config:
-                env_config['output'] = {}
-            env_config['output']['base_directory'] = os.getenv('OUTPUT_BASE_DIR')
-        if os.getenv('LOCAL_BASE_PATH'):
-            if 'local' not in env_config:
-                env_config['local'] = {}
-            env_config['local']['base_path'] = os.getenv('LOCAL_BASE_PATH')
+                continue
+            
+            # 按路径写入嵌套字典
+            target = env_config
+            for key in config_path[:-1]:
+                target = target.setdefault(key, {})
+            target[config_path[-1]] = value
         
         return env_config
     
     def save_config(self, config: Dict[str, Any] = None):
         """保存配置到文件"""
         config_to_save = config or self.config
+        _FILE_CACHE.pop(os.path.abspath(self.config_file), None)
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_to_save, f, indent=2, ensure_ascii=False)
+            with open(self.config_file, 'wb') as f:
+                f.write(_json_dumps(config_to_save))
         except Exception as e:
             print(f"保存配置文件失败: {e}")
     
@@ -130,10 +178,8 @@ class Config:
     
     def get_poppler_path(self) -> str:
         """获取Poppler路径"""
-        import sys
-        
         # 在Linux系统上，poppler通常通过包管理器安装，不需要指定路径
-        if sys.platform.startswith('linux'):
+        if _IS_LINUX:
             return None
         
         # Windows系统需要指定poppler路径
@@ -176,12 +222,16 @@ class Config:
         return True
     
     def _deep_update(self, base_dict: Dict[str, Any], update_dict: Dict[str, Any]):
-        """递归更新字典"""
-        for key, value in update_dict.items():
-            if key in base_dict and isinstance(base_dict[key], dict) and isinstance(value, dict):
-                self._deep_update(base_dict[key], value)
-            else:
-                base_dict[key] = value
+        """递归更新字典（使用显式栈实现）"""
+        stack = [(base_dict, update_dict)]
+        while stack:
+            base, update = stack.pop()
+            for key, value in update.items():
+                current = base.get(key)
+                if isinstance(current, dict) and isinstance(value, dict):
+                    stack.append((current, value))
+                else:
+                    base[key] = value
     
     def update_config(self, new_config: Dict[str, Any], save_to_file: bool = True):
         """更新配置"""
@@ -207,13 +257,12 @@ def create_sample_config():
     }
     
     # 只在Windows系统上添加poppler_path配置
-    import sys
-    if sys.platform == 'win32':
+    if _IS_WIN32:
         sample_config["poppler_path"] = "D:/poppler-25.07.0/Library/bin"
     
     config_file = "config.sample.json"
-    with open(config_file, 'w', encoding='utf-8') as f:
-        json.dump(sample_config, f, indent=2, ensure_ascii=False)
+    with open(config_file, 'wb') as f:
+        f.write(_json_dumps(sample_config))
     
     print(f"已创建示例配置文件: {config_file}")
     print("请复制为 config.json 并修改相应配置")
@@ -225,5 +274,6 @@ if __name__ == "__main__":
     
     # 测试配置加载
     config = Config()
+    config.ensure_default_file()
     print("当前配置:")
     print(json.dumps(config.config, indent=2, ensure_ascii=False))
\ No newline at end of file
@@ -4,12 +4,22 @@
 核心数据处理器模块
 专注于生成模板变量，保持源文件格式
 """
-import copy
+import hashlib
 import io
+import json
 import os
+import re
+import shutil
+import zipfile
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import cached_property
+from types import MappingProxyType
 from typing import Dict, List, Any
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
 
 try:
     from excel2img import process_file
@@ -26,11 +36,124 @@ except ImportError:
     PDFParser = None
 from file_scanner import FileScanner
 from minio_file_scanner import MinioFileScanner
+from temp_utils import create_excel_temp_dir, create_pdf_images_temp_dir, get_project_temp_dir
+
+
+def _compile_keyword_pattern(*rule_tables) -> re.Pattern:
+    """将规则表中的全部文件名关键字编译为一个正则，一次扫描即可找出所有命中的关键字"""
+    keywords = {
+        keyword
+        for rules in rule_tables
+        for ext_rules in rules.values()
+        for rule_keywords, _, _ in ext_rules
+        for keyword in rule_keywords
+    }
+    # 使用零宽前瞻以便找出相互重叠的关键字，长关键字优先
+    alternation = '|'.join(map(re.escape, sorted(keywords, key=len, reverse=True)))
+    return re.compile(f'(?=({alternation}))')
 
 
 class CoreDataProcessor:
     """核心数据处理器类"""
 
+    # 变量映射关系: {变量名: 变量说明}
+    _VARIABLE_MAPPING = MappingProxyType({
+        'report_date': '报告生成时间',
+        'year': '年份',
+        'month': '月份',
+        'network_failure_stats': '网络故障统计',
+        'blackhole_ip_stats': '黑洞路由器IP统计',
+        'ip_statistics': 'IP统计信息',
+        'fault_drill_plan_unicom_night': '中国联通出口故障演习方案（夜班及节假日）',
+        'fault_drill_plan_unicom_day': '中国联通出口故障演习方案（白班）',
+        'fault_drill_plan_unicom_international_night': '联通国际出口故障演习方案（夜班及节假日）',
+        'fault_drill_plan_unicom_international_day': '联通国际出口故障演习方案（白班）',
+        'internet_traffic_stats': '互联网出口业务流量统计',
+        'isp_bandwidth': 'ISP业务宽带复用比',
+        'idc_traffic_stats': 'IDC业务出口流量统计',
+        'isp_traffic_stats': 'ISP业务出口流量统计',
+        'dedicated_traffic_peak': '专线托管峰值流量',
+        'bandwidth_usage': '带宽使用统计',
+        'core_device_hardware': '核心设备硬件指标',
+        'monthly_work_plan': '计划性项目',
+        'sdwan_project': 'SDWAN项目',
+        'device_running_report_and_suggestion':'网络设备运行报告和建议',
+    })
+
+    # 各变量的默认占位内容
+    _DEFAULT_VARIABLES = MappingProxyType({
+        var_name: f"[{description}：暂无数据]"
+        for var_name, description in _VARIABLE_MAPPING.items()
+    })
+
+    # 目录规则: (目录名关键字, 处理方法名)，按顺序取第一个匹配项
+    _DIRECTORY_HANDLERS = [
+        ("监控中心运维报告", '_process_monitor_center_operation_report_files'),
+        ("核心网络流量统计报告", '_process_core_network_traffic_statistics_report_files'),
+        ("核心设备运行报告", '_process_core_equipment_operation_report_files'),
+        ("月度计划及总结", '_process_monthly_plan_and_summary_files'),
+    ]
+
+    # 文件名规则: {扩展名: [(关键字元组, 变量名, 处理方法名), ...]}
+    # 关键字需全部出现在文件名中才算匹配；xlsx的变量名为元组时按页依次赋值
+    _MONITOR_RULES = {
+        '.docx': [
+            (('网络故障统计',), 'network_failure_stats', '_handle_first_table'),
+            (('黑洞路由器',), 'blackhole_ip_stats', '_handle_sub_doc'),
+            (('IP',), 'ip_statistics', '_handle_sub_doc'),
+        ],
+        '.xlsx': [
+            (('中国联通1出口故障演习', '白班'), 'fault_drill_plan_unicom_day', '_handle_drill_record'),
+            (('中国联通1出口故障演习', '夜班'), 'fault_drill_plan_unicom_night', '_handle_drill_record'),
+            (('联通国际出口', '白班'), 'fault_drill_plan_unicom_international_day', '_handle_drill_record'),
+            (('联通国际出口', '夜班'), 'fault_drill_plan_unicom_international_night', '_handle_drill_record'),
+        ],
+    }
+
+    _TRAFFIC_RULES = {
+        '.docx': [
+            (('专线托管',), 'dedicated_traffic_peak', '_handle_sub_doc'),
+            (('带宽使用',), 'bandwidth_usage', '_handle_sub_doc'),
+        ],
+        '.xlsx': [
+            (('互联网出口业务流量',), ('internet_traffic_stats', 'isp_bandwidth'), '_handle_workbook_images'),
+            (('IDC业务出口流量',), ('idc_traffic_stats',), '_handle_workbook_images'),
+            (('ISP业务出口流量',), ('isp_traffic_stats',), '_handle_workbook_images'),
+        ],
+    }
+
+    _MONTHLY_RULES = {
+        '.docx': [
+            (('报告及建议',), 'device_running_report_and_suggestion', '_handle_sub_doc'),
+        ],
+        '.xlsx': [
+            ((), ('monthly_work_plan', 'sdwan_project'), '_handle_workbook_images'),
+        ],
+    }
+
+    # 只取第一个匹配规则的扩展名（如“黑洞路由器IP统计”同时包含“IP”）
+    _FIRST_MATCH_EXTENSIONS = frozenset({'.docx'})
+
+    _KEYWORD_PATTERN = _compile_keyword_pattern(_MONITOR_RULES, _TRAFFIC_RULES, _MONTHLY_RULES)
+
+    # 图片变量的自定义宽度（厘米）
+    _IMAGE_WIDTHS = {'internet_traffic_stats': 18}
+
+    # 并发处理目录的最大线程数
+    _MAX_DIRECTORY_WORKERS = 4
+
+    # 并发解析PDF的最大线程数
+    _MAX_PDF_WORKERS = 8
+
+    # PDF解析缓存最多保留的条目数
+    _PDF_CACHE_MAX_ENTRIES = 64
+
+    # 计算PDF内容哈希时的读取块大小
+    _HASH_CHUNK_SIZE = 1024 * 1024
+
+    # 空白docx模板内容，首次提取表格时生成
+    _EMPTY_DOC_BYTES = None
+
     def __init__(self, use_minio=False, minio_config=None, config=None):
         """初始化数据处理器
         
@@ -41,21 +164,13 @@ class CoreDataProcessor:
         """
         self.use_minio = use_minio
         self.config = config
-        
-        # 初始化PDF解析器
-        self.pdf_parser = None
-        if PDFParser:
-            pdf_api_url = config.get_pdf_api_url() if config else 'http://187.9.9.8:7434/v2/parse/file'
-            pdf_parse_mode = config.get_pdf_parse_mode() if config else 'api'
-            pdf_image_dpi = config.get_pdf_to_image_dpi() if config else 200
-            poppler_path = config.get_poppler_path() if config else None
-            
-            self.pdf_parser = PDFParser(
-                api_url=pdf_api_url,
-                parse_mode=pdf_parse_mode,
-                image_dpi=pdf_image_dpi,
-                poppler_path=poppler_path
-            )
+        self._poppler_path = config.get_poppler_path() if config else None
+        # Excel渲染结果缓存: {(绝对路径, mtime, sheet名称, dpi): 图片路径元组}
+        self._render_cache = {}
+        # 预先解析的PDF结果: {文件路径: 解析结果}
+        self._pdf_results = {}
+        # 文件扫描结果缓存: {目标日期: 扫描结果}
+        self._scan_cache = {}
         
         if use_minio and minio_config:
             # 使用配置中的base_prefix
@@ -67,29 +182,19 @@ class CoreDataProcessor:
             base_path = local_config.get('base_path', '核心网络部运维报告')
             self.scanner = FileScanner(base_path)
 
-        # 定义变量映射关系
-        self.variable_mapping = {
-            'report_date': '报告生成时间',
-            'year': '年份',
-            'month': '月份',
-            'network_failure_stats': '网络故障统计',
-            'blackhole_ip_stats': '黑洞路由器IP统计',
-            'ip_statistics': 'IP统计信息',
-            'fault_drill_plan_unicom_night': '中国联通出口故障演习方案（夜班及节假日）',
-            'fault_drill_plan_unicom_day': '中国联通出口故障演习方案（白班）',
-            'fault_drill_plan_unicom_international_night': '联通国际出口故障演习方案（夜班及节假日）',
-            'fault_drill_plan_unicom_international_day': '联通国际出口故障演习方案（白班）',
-            'internet_traffic_stats': '互联网出口业务流量统计',
-            'isp_bandwidth': 'ISP业务宽带复用比',
-            'idc_traffic_stats': 'IDC业务出口流量统计',
-            'isp_traffic_stats': 'ISP业务出口流量统计',
-            'dedicated_traffic_peak': '专线托管峰值流量',
-            'bandwidth_usage': '带宽使用统计',
-            'core_device_hardware': '核心设备硬件指标',
-            'monthly_work_plan': '计划性项目',
-            'sdwan_project': 'SDWAN项目',
-            'device_running_report_and_suggestion':'网络设备运行报告和建议',
-        }
+    @cached_property
+    def pdf_parser(self):
+        """PDF解析器，首次遇到PDF文件时才创建"""
+        if not PDFParser:
+            return None
+
+        config = self.config
+        return PDFParser(
+            api_url=config.get_pdf_api_url() if config else 'http://187.9.9.8:7434/v2/parse/file',
+            parse_mode=config.get_pdf_parse_mode() if config else 'api',
+            image_dpi=config.get_pdf_to_image_dpi() if config else 200,
+            poppler_path=self._poppler_path
+        )
 
     def process_all_files(self, template_variables: set = None, target_date: str = None) -> Dict[str, str]:
         """
@@ -102,20 +207,15 @@ class CoreDataProcessor:
         Returns:
             Dict[str, str]: 模板变量字典
         """
-        # 初始化变量字典
-        variables = {}
-
-        # 如果指定了模板变量，只初始化这些变量
+        # 初始化变量字典，如果指定了模板变量，只初始化这些变量
         if template_variables:
-            for var_name in template_variables:
-                if var_name in self.variable_mapping:
-                    variables[var_name] = f"[{self.variable_mapping[var_name]}：暂无数据]"
-                else:
-                    variables[var_name] = f"[未知变量: {var_name}]"
+            variables = {
+                var_name: self._DEFAULT_VARIABLES.get(var_name, f"[未知变量: {var_name}]")
+                for var_name in template_variables
+            }
         else:
             # 处理所有变量
-            for var_name in self.variable_mapping.keys():
-                variables[var_name] = f"[{self.variable_mapping[var_name]}：暂无数据]"
+            variables = dict(self._DEFAULT_VARIABLES)
 
         # 设置报告生成时间
         if 'report_date' in variables:
@@ -134,232 +234,182 @@ class CoreDataProcessor:
             variables['year'] = target_date[:4]
             variables['month'] = target_date[4:]
         # 扫描所有文件
-        if self.use_minio:
-            # 如果使用Minio，则传递target_date参数
-            file_dict = self.scanner.scan_files(target_date)
-        else:
-            # 如果使用本地文件，则忽略target_date参数
-            file_dict = self.scanner.scan_files()
+        file_dict = self._scan_files(target_date)
 
-        # 处理各个目录的文件
+        # 按目录匹配处理方法
+        jobs = []
         for directory, files in file_dict.items():
-            if "监控中心运维报告" in directory:
-                self._process_monitor_center_operation_report_files(files, variables)
-            elif "核心网络流量统计报告" in directory:
-                self._process_core_network_traffic_statistics_report_files(files, variables)
-            elif "核心设备运行报告" in directory:
-                self._process_core_equipment_operation_report_files(files, variables)
-            elif "月度计划及总结" in directory:
-                self._process_monthly_plan_and_summary_files(files, variables)
+            for keyword, handler in self._DIRECTORY_HANDLERS:
+                if keyword in directory:
+                    jobs.append((getattr(self, handler), files))
+                    break
+
+        try:
+            # 先并发解析全部PDF，避免逐个等待解析接口
+            self._prefetch_pdf_results([
+                file_path for _, files in jobs for file_path in files if file_path.endswith('.pdf')
+            ])
+
+            # 各目录的处理相互独立且以I/O为主（Excel转图片、PDF解析），并发执行
+            # 每个任务写入各自的变量分片，完成后按目录顺序合并
+            shards = [{} for _ in jobs]
+            with ThreadPoolExecutor(max_workers=self._MAX_DIRECTORY_WORKERS) as executor:
+                futures = [
+                    executor.submit(handler, files, ChainMap(shard, variables))
+                    for (handler, files), shard in zip(jobs, shards)
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            self._close_pdf_parser()
+
+        for shard in shards:
+            variables.update(shard)
 
         return variables
 
-    def _process_monitor_center_operation_report_files(self, files: List[str], variables: Dict[str, Any]):
-        """处理张嵩的运维报告文件，保持完整格式"""
-        summary_parts = []
+    def _close_pdf_parser(self):
+        """关闭已创建的PDF解析器及其HTTP会话，下次处理时重新创建"""
+        parser = self.__dict__.pop('pdf_parser', None)
+        if parser:
+            parser.close()
 
-        for file_path in files:
-            filename = os.path.basename(file_path)
+    def _scan_files(self, target_date: str) -> Dict[str, List[str]]:
+        """
+        扫描文件，同一目标日期只扫描一次
 
-            if file_path.endswith('.pdf'):
-                # 处理PDF文件
-                self._process_pdf_file(file_path, variables)
-            elif file_path.endswith('.docx'):
-                # content = self.docx_reader.read_docx_content(file_path)
-
-                if '网络故障统计' in filename:
-                    if 'network_failure_stats' in variables:
-                        # 使用完整格式信息提取第一个表格
-                        variables['network_failure_stats'] = {
-                            'type': 'sub_doc',
-                            'value': self._extract_first_table_from_docx(file_path)
-                        }
-                        summary_parts.append("网络故障统计报告")
+        Args:
+            target_date: 目标日期，格式为YYYYMM
 
-                elif '黑洞路由器' in filename:
-                    if 'blackhole_ip_stats' in variables:
-                        variables['blackhole_ip_stats'] = {
-                            'type': 'sub_doc',
-                            'value': file_path
-                        }
-                        summary_parts.append("黑洞路由器IP统计")
+        Returns:
+            Dict[str, List[str]]: 以目录名为键，文件路径列表为值的字典
+        """
+        # 本地文件不区分日期
+        key = target_date if self.use_minio else None
+        if key not in self._scan_cache:
+            if self.use_minio:
+                # 如果使用Minio，则传递target_date参数
+                self._scan_cache[key] = self.scanner.scan_files(target_date)
+            else:
+                # 如果使用本地文件，则忽略target_date参数
+                self._scan_cache[key] = self.scanner.scan_files()
+        return self._scan_cache[key]
 
-                elif 'IP' in filename:
-                    if 'ip_statistics' in variables:
-                        variables['ip_statistics'] = {
-                            'type': 'sub_doc',
-                            'value': file_path
-                        }
-                        summary_parts.append("IP统计信息")
+    def clear_scan_cache(self):
+        """清除文件扫描缓存，下次处理时重新扫描"""
+        self._scan_cache.clear()
+
+    def _process_monitor_center_operation_report_files(self, files: List[str], variables: Dict[str, Any]):
+        """处理张嵩的运维报告文件，保持完整格式"""
+        self._process_files_by_rules(files, variables, self._MONITOR_RULES)
 
-            elif file_path.endswith('.xlsx'):
-                # 验证文件是否存在
-                if not os.path.exists(file_path):
-                    print(f"警告：文件不存在: {file_path}")
-                    continue
-                    
-                if '中国联通1出口故障演习' in filename:
-                    poppler_path = self.config.get_poppler_path() if self.config else None
-                    if '白班' in filename:
-                        imgs = process_file(file_path, 200, None, poppler_path, False, '演练记录')
-                        if len(imgs) > 0:
-                            if  len(imgs) == 1:
-                                variables['fault_drill_plan_unicom_day'] = {
-                                    'type': 'image',
-                                    'value': imgs[0]
-                                }
-                            else:
-                                variables['fault_drill_plan_unicom_day'] = {
-                                    'type': 'image',
-                                    'value': imgs[1]
-                                }
-                    if '夜班' in filename:
-                        imgs = process_file(file_path, 200, None, poppler_path, False, '演练记录')
-                        if len(imgs) > 0:
-                            if len(imgs) == 1:
-                                variables['fault_drill_plan_unicom_night'] = {
-                                    'type': 'image',
-                                    'value': imgs[0]
-                                }
-                            else:
-                                variables['fault_drill_plan_unicom_night'] = {
-                                    'type': 'image',
-                                    'value': imgs[1]
-                                }
-                if '联通国际出口' in filename:
-                    poppler_path = self.config.get_poppler_path() if self.config else None
-                    if '白班' in filename:
-                        imgs = process_file(file_path, 200, None, poppler_path, False, '演练记录')
-                        if len(imgs) > 0:
-                            if len(imgs) == 1:
-                                variables['fault_drill_plan_unicom_international_day'] = {
-                                    'type': 'image',
-                                    'value': imgs[0]
-                                }
-                            else:
-                                variables['fault_drill_plan_unicom_international_day'] = {
-                                    'type': 'image',
-                                    'value': imgs[1]
-                                }
-                    if '夜班' in filename:
-                        imgs = process_file(file_path, 200, None, poppler_path, False, '演练记录')
-                        if len(imgs) > 0:
-                            if len(imgs) == 1:
-                                variables['fault_drill_plan_unicom_international_night'] = {
-                                    'type': 'image',
-                                    'value': imgs[0]
-                                }
-                            else:
-                                variables['fault_drill_plan_unicom_international_night'] = {
-                                    'type': 'image',
-                                    'value': imgs[1]
-                                }
     def _process_core_network_traffic_statistics_report_files(self, files: List[str], variables: Dict[str, Any]):
         """处理李曦炎的运维报告文件，保持完整格式"""
-        for file_path in files:
-            filename = os.path.basename(file_path)
-
-            if file_path.endswith('.pdf'):
-                # 处理PDF文件
-                self._process_pdf_file(file_path, variables)
-            elif file_path.endswith('.docx'):
-                if '专线托管' in filename:
-                    if 'dedicated_traffic_peak' in variables:
-                        variables['dedicated_traffic_peak'] = {
-                            'type': 'sub_doc',
-                            'value': file_path
-                        }
-
-                elif '带宽使用' in filename:
-                    if 'bandwidth_usage' in variables:
-                        variables['bandwidth_usage'] = {
-                            'type': 'sub_doc',
-                            'value': file_path
-                        }
-
-            elif file_path.endswith('.xlsx'):
-                # 验证文件是否存在
-                if not os.path.exists(file_path):
-                    print(f"警告：文件不存在: {file_path}")
-                    continue
-                    
-                if '互联网出口业务流量' in filename:
-                    poppler_path = self.config.get_poppler_path() if self.config else None
-                    imgs = process_file(file_path, 200, None, poppler_path, False, None )
-                    if len(imgs) > 0:
-                        variables['internet_traffic_stats'] = {
-                            'type': 'image',
-                            'value': imgs[0],
-                            'width': 18
-                        }
-                        if imgs[1]:
-                            variables['isp_bandwidth'] = {
-                                'type': 'image',
-                                'value': imgs[1]
-                            }
-
-                elif 'IDC业务出口流量' in filename:
-                    poppler_path = self.config.get_poppler_path() if self.config else None
-                    imgs = process_file(file_path, 200, None, poppler_path, False, None)
-                    if len(imgs) > 0:
-                        variables['idc_traffic_stats'] = {
-                            'type': 'image',
-                            'value': imgs[0]
-                        }
-                elif 'ISP业务出口流量' in filename:
-                    poppler_path = self.config.get_poppler_path() if self.config else None
-                    imgs = process_file(file_path, 200, None, poppler_path, False, None)
-                    if len(imgs) > 0:
-                        variables['isp_traffic_stats'] = {
-                            'type': 'image',
-                            'value': imgs[0]
-                        }
+        self._process_files_by_rules(files, variables, self._TRAFFIC_RULES)
 
     def _process_core_equipment_operation_report_files(self, files: List[str], variables: Dict[str, Any]):
         """处理王子徽的监控报告文件"""
-        summary_parts = []
-
-        for file_path in files:
-            filename = os.path.basename(file_path)
-
-            if file_path.endswith('.pdf'):
-                # 处理PDF文件
-                self._process_pdf_file(file_path, variables)
+        self._process_files_by_rules(files, variables, {})
 
     def _process_monthly_plan_and_summary_files(self, files: List[str], variables: Dict[str, Any]):
         """处理陈斌的月度计划总结文件"""
+        self._process_files_by_rules(files, variables, self._MONTHLY_RULES)
 
+    def _process_files_by_rules(self, files: List[str], variables: Dict[str, Any], rules: Dict[str, list]):
+        """
+        按扩展名和文件名关键字规则处理目录下的文件
+
+        Args:
+            files: 文件路径列表
+            variables: 变量字典
+            rules: 以扩展名为键的规则表，规则格式为 (关键字元组, 变量名, 处理方法名)
+        """
         for file_path in files:
             filename = os.path.basename(file_path)
+            ext = os.path.splitext(filename)[1]
 
-            if file_path.endswith('.pdf'):
+            if ext == '.pdf':
                 # 处理PDF文件
                 self._process_pdf_file(file_path, variables)
-            elif file_path.endswith('.docx'):
-                if '报告及建议' in filename:
-                    if 'device_running_report_and_suggestion' in variables:
-                        variables['device_running_report_and_suggestion'] = {
-                            'type': 'sub_doc',
-                            'value': file_path
-                        }
-            elif file_path.endswith('.xlsx'):
-                # 验证文件是否存在
-                if not os.path.exists(file_path):
-                    print(f"警告：文件不存在: {file_path}")
-                    continue
-                    
-                poppler_path = self.config.get_poppler_path() if self.config else None
-                imgs = process_file(file_path, 200, None, poppler_path, False, None)
-                if len(imgs) > 0:
-                    variables['monthly_work_plan'] = {
-                        'type': 'image',
-                        'value': imgs[0]
-                    }
-                    if imgs[1]:
-                        variables['sdwan_project'] = {
-                            'type': 'image',
-                            'value': imgs[1]
-                        }
+                continue
+
+            ext_rules = rules.get(ext)
+            if not ext_rules:
+                continue
+
+            # 验证文件是否存在，Minio模式下的文件在下载时已经验证过
+            if ext == '.xlsx' and not self.use_minio and not os.path.exists(file_path):
+                print(f"警告：文件不存在: {file_path}")
+                continue
+
+            tags = set(self._KEYWORD_PATTERN.findall(filename))
+            for keywords, target, handler in ext_rules:
+                if tags.issuperset(keywords):
+                    getattr(self, handler)(file_path, target, variables)
+                    if ext in self._FIRST_MATCH_EXTENSIONS:
+                        break
+
+    def _handle_first_table(self, file_path: str, var_name: str, variables: Dict[str, Any]):
+        """提取docx中的第一个表格作为子文档"""
+        if var_name in variables:
+            # 使用完整格式信息提取第一个表格
+            variables[var_name] = {
+                'type': 'sub_doc',
+                'value': self._extract_first_table_from_docx(file_path)
+            }
+
+    def _handle_sub_doc(self, file_path: str, var_name: str, variables: Dict[str, Any]):
+        """将整个docx作为子文档"""
+        if var_name in variables:
+            variables[var_name] = {
+                'type': 'sub_doc',
+                'value': file_path
+            }
+
+    def _handle_drill_record(self, file_path: str, var_name: str, variables: Dict[str, Any]):
+        """将演练记录工作表转为图片，有多页时取第二页"""
+        imgs = self._render_xlsx(file_path, '演练记录')
+        if len(imgs) > 0:
+            variables[var_name] = {
+                'type': 'image',
+                'value': imgs[0] if len(imgs) == 1 else imgs[1]
+            }
+
+    def _handle_workbook_images(self, file_path: str, var_names: tuple, variables: Dict[str, Any]):
+        """将整个工作簿转为图片，按页依次赋给各变量"""
+        imgs = self._render_xlsx(file_path)
+        for var_name, img in zip(var_names, imgs):
+            variables[var_name] = {
+                'type': 'image',
+                'value': img
+            }
+            if var_name in self._IMAGE_WIDTHS:
+                variables[var_name]['width'] = self._IMAGE_WIDTHS[var_name]
+
+    def _render_xlsx(self, file_path: str, sheet_name: str = None, dpi: int = 200) -> tuple:
+        """
+        将Excel转为图片，同一文件未修改时复用上次的渲染结果
+
+        Args:
+            file_path: Excel文件路径
+            sheet_name: 工作表名称，None表示全部工作表
+            dpi: 图片DPI
+
+        Returns:
+            tuple: 图片路径元组
+        """
+        abs_path = os.path.abspath(file_path)
+        key = (abs_path, os.path.getmtime(abs_path), sheet_name, dpi)
+        if key not in self._render_cache:
+            # 每个文件使用独立的输出目录，避免并发处理同名文件时互相覆盖
+            out_dir = os.path.join(
+                create_excel_temp_dir(),
+                hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:12]
+            )
+            self._render_cache[key] = tuple(
+                process_file(file_path, dpi, out_dir, self._poppler_path, False, sheet_name)
+            )
+        return self._render_cache[key]
 
     def generate_appendix(self, file_dict: Dict[str, List[str]]) -> str:
         """生成附录内容"""
@@ -381,23 +431,40 @@ class CoreDataProcessor:
 
     def _extract_first_table_from_docx(self, file_path: str):
         """
-        从 DOCX 内容中提取第一个表格的数据，保持完整格式
+        从 DOCX 文件中提取第一个表格，保持完整格式
+
+        只解析 word/document.xml，不加载整个文档
 
         Args:
-            content: 由 CoreDocxReader.read_docx_content 返回的内容字典
+            file_path: DOCX 文件路径
 
         Returns:
-            str: 第一个表格的数据，带有完整格式信息或管道分隔符格式
+            io.BytesIO: 仅包含第一个表格的新文档
         """
-        doc = Document(file_path)
-        first_table = copy.deepcopy(doc.tables[0]._element)
-        new_doc = Document()
+        with zipfile.ZipFile(file_path) as docx_zip:
+            document_xml = docx_zip.read('word/document.xml')
+
+        body = parse_xml(document_xml).find(qn('w:body'))
+        first_table = body.find(qn('w:tbl')) if body is not None else None
+        if first_table is None:
+            raise ValueError(f"文档中没有表格: {file_path}")
+
+        new_doc = Document(io.BytesIO(self._get_empty_doc_bytes()))
         new_doc.element.body.append(first_table)
         bio = io.BytesIO()
         new_doc.save(bio)
         bio.seek(0)
         return bio
 
+    @classmethod
+    def _get_empty_doc_bytes(cls) -> bytes:
+        """获取空白文档的字节内容，只生成一次"""
+        if cls._EMPTY_DOC_BYTES is None:
+            bio = io.BytesIO()
+            Document().save(bio)
+            cls._EMPTY_DOC_BYTES = bio.getvalue()
+        return cls._EMPTY_DOC_BYTES
+
     def _extract_formatted_content(self, file_path: str) -> str:
         """
         提取DOCX内容的完整格式信息，保持所有表格和段落的格式
@@ -413,6 +480,114 @@ class CoreDataProcessor:
 
         return result_parts
 
+    def _parse_pdf(self, file_path: str) -> Dict[str, Any]:
+        """
+        调用PDF解析器解析单个文件，源文件未修改时复用磁盘缓存的结果
+
+        Args:
+            file_path: PDF文件路径
+
+        Returns:
+            Dict: 解析结果
+        """
+        # 以路径和文件内容作为缓存键：Minio模式每次重新下载，修改时间会变化但内容不变
+        cache_key = f"{hashlib.sha1(file_path.encode('utf-8')).hexdigest()}-{self._file_digest(file_path)}"
+        cache_root = get_project_temp_dir('pdf_cache')
+        cache_file = os.path.join(cache_root, f"{cache_key}-{self.pdf_parser.parse_mode}.json")
+
+        cached = self._load_pdf_cache(cache_file)
+        if cached is not None:
+            print(f"使用PDF解析缓存: {os.path.basename(file_path)}")
+            return cached
+
+        # 多个PDF并发解析，每个PDF使用单独的图片子目录，避免同名图片互相覆盖；
+        # 子目录由解析器在确实需要保存图片时创建
+        cache_name = os.path.splitext(os.path.basename(cache_file))[0]
+        image_dir = os.path.join(
+            create_pdf_images_temp_dir(), hashlib.sha1(cache_name.encode('utf-8')).hexdigest()[:16]
+        )
+        result = self.pdf_parser.parse_pdf(file_path, extract_images=True, image_output_dir=image_dir)
+
+        if result.get('success'):
+            try:
+                # 原始markdown包含完整的base64图片数据，不写入缓存
+                cached_result = {k: v for k, v in result.items() if k != 'original_markdown'}
+                # 记录图片目录，缓存被淘汰时一并删除
+                cached_result['image_dir'] = image_dir
+                with open(cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(cached_result, f, ensure_ascii=False)
+                self._evict_pdf_cache(cache_root)
+            except Exception as e:
+                print(f"写入PDF解析缓存失败: {e}")
+
+        return result
+
+    @classmethod
+    def _file_digest(cls, file_path: str) -> str:
+        """计算文件大小和内容哈希"""
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls._HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return f"{os.path.getsize(file_path)}-{digest.hexdigest()}"
+
+    @classmethod
+    def _evict_pdf_cache(cls, cache_root: str):
+        """按最近使用时间淘汰多余的PDF解析缓存，同时删除缓存引用的图片目录"""
+        entries = [e for e in os.scandir(cache_root) if e.is_file() and e.name.endswith('.json')]
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in entries[cls._PDF_CACHE_MAX_ENTRIES:]:
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    image_dir = json.load(f).get('image_dir')
+            except Exception:
+                image_dir = None
+            if image_dir:
+                shutil.rmtree(image_dir, ignore_errors=True)
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _load_pdf_cache(cache_file: str):
+        """读取PDF解析缓存，缓存不存在或引用的图片已被清理时返回None"""
+        if not os.path.exists(cache_file):
+            return None
+
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except Exception:
+            return None
+
+        image_paths = result.get('image_paths') or [image['path'] for image in result.get('images', [])]
+        if not all(os.path.exists(path) for path in image_paths):
+            return None
+
+        # 更新文件时间，供淘汰时判断最近使用
+        os.utime(cache_file)
+        return result
+
+    def _prefetch_pdf_results(self, pdf_paths: List[str]):
+        """
+        并发解析多个PDF文件，结果暂存后由_process_pdf_file使用
+
+        Args:
+            pdf_paths: PDF文件路径列表
+        """
+        if not pdf_paths or not self.pdf_parser:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self._MAX_PDF_WORKERS, len(pdf_paths))) as executor:
+            futures = {executor.submit(self._parse_pdf, path): path for path in pdf_paths}
+            for future, path in futures.items():
+                try:
+                    self._pdf_results[path] = future.result()
+                except Exception as e:
+                    # 预解析失败时由_process_pdf_file重新解析并报告错误
+                    print(f"PDF预解析失败 {os.path.basename(path)}: {e}")
+
     def _process_pdf_file(self, file_path: str, variables: Dict[str, Any]):
         """
         处理PDF文件
@@ -428,18 +603,10 @@ class CoreDataProcessor:
         try:
             print(f"正在处理PDF文件: {os.path.basename(file_path)}")
             
-            # 创建图片输出目录
-            from datetime import datetime
-            from temp_utils import create_pdf_images_temp_dir
-            date_str = datetime.now().strftime('%Y%m%d')
-            image_dir = create_pdf_images_temp_dir()
-            
-            # 解析PDF
-            result = self.pdf_parser.parse_pdf(
-                file_path, 
-                extract_images=True,
-                image_output_dir=image_dir
-            )
+            # 解析PDF，优先使用预先并发解析的结果
+            result = self._pdf_results.pop(file_path, None)
+            if result is None:
+                result = self._parse_pdf(file_path)
             
             if result['success']:
                 # 检查解析模式
@@ -1,14 +1,37 @@
 #!/usr/bin/env python3
-import datetime
-import time
-
 import uno
 import os
-import sys
+import hashlib
+import json
+import shutil
+import tempfile
 import argparse
+import threading
+from functools import lru_cache
 from com.sun.star.beans import PropertyValue
-from pdf2image import convert_from_path
-from PIL import Image, ImageChops
+from com.sun.star.lang import DisposedException
+from image_utils import render_pdf_pages
+from temp_utils import create_excel_temp_dir, get_project_temp_dir
+
+# 导出时统一设置的页面样式属性，setPropertyValues 要求属性名按字母顺序排列
+_PAGE_STYLE_NAMES = (
+    "BottomMargin", "FooterIsOn", "HeaderIsOn", "LeftMargin",
+    "RightMargin", "ScaleToPagesX", "ScaleToPagesY", "TopMargin",
+)
+_PAGE_STYLE_VALUES = (0, False, False, 0, 0, 1, 1, 0)
+
+# Excel 图片缓存最多保留的条目数
+_CACHE_MAX_ENTRIES = 64
+
+# 计算 Excel 内容哈希时的读取块大小
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 进程内复用的 LibreOffice Desktop 连接
+_DESKTOP = None
+_DESKTOP_LOCK = threading.Lock()
+
+# LibreOffice 不支持多个线程同时通过同一 UNO 连接打开/导出/关闭文档，整个导出过程串行执行
+_EXPORT_LOCK = threading.Lock()
 
 
 def connect_to_libreoffice():
@@ -23,96 +46,91 @@ def connect_to_libreoffice():
     return ctx
 
 
+def _get_desktop(reconnect=False):
+    """获取缓存的 LibreOffice Desktop，首次调用或 reconnect=True 时重新连接"""
+    global _DESKTOP
+    with _DESKTOP_LOCK:
+        if _DESKTOP is None or reconnect:
+            ctx = connect_to_libreoffice()
+            _DESKTOP = ctx.ServiceManager.createInstanceWithContext(
+                "com.sun.star.frame.Desktop", ctx
+            )
+        return _DESKTOP
+
+
+def _load_document(input_url):
+    """通过缓存的连接打开文档，连接已断开时重连一次"""
+    try:
+        return _get_desktop().loadComponentFromURL(input_url, "_blank", 0, ())
+    except DisposedException:
+        return _get_desktop(reconnect=True).loadComponentFromURL(input_url, "_blank", 0, ())
+
+
+def _configure_page_style(page_style):
+    """一次 UNO 调用设置一页宽一页高、0 边距、关闭页眉页脚"""
+    page_style.setPropertyValues(_PAGE_STYLE_NAMES, _PAGE_STYLE_VALUES)
+
+
 def excel_to_pdf_uno(input_path, output_pdf, sheet_name=None):
     """UNO 打开 Excel 并按一页宽一页高导出 PDF，并确保释放文档"""
-    ctx = connect_to_libreoffice()
-    desktop = ctx.ServiceManager.createInstanceWithContext(
-        "com.sun.star.frame.Desktop", ctx
-    )
 
     os.makedirs(os.path.dirname(output_pdf), exist_ok=True)
 
     input_url = uno.systemPathToFileUrl(os.path.abspath(input_path))
     output_url = uno.systemPathToFileUrl(os.path.abspath(output_pdf))
 
-    doc = None
-    try:
-        doc = desktop.loadComponentFromURL(input_url, "_blank", 0, ())
-
-        # 如果指定了sheet_name，只处理该sheet
-        if sheet_name:
-            # 查找指定的sheet
-            target_sheet = None
-            sheet_index = -1
-            for i, sheet in enumerate(doc.Sheets):
-                if sheet.Name == sheet_name:
-                    target_sheet = sheet
-                    sheet_index = i
-                    break
-
-            if target_sheet is None:
-                raise ValueError(f"找不到名为 '{sheet_name}' 的工作表")
-
-            # 设置页面样式
-            page_style_name = target_sheet.PageStyle
-            page_style = doc.StyleFamilies.getByName("PageStyles").getByName(page_style_name)
-            page_style.setPropertyValue("ScaleToPagesX", 1)
-            page_style.setPropertyValue("ScaleToPagesY", 1)
-            page_style.LeftMargin = 0
-            page_style.RightMargin = 0
-            page_style.TopMargin = 0
-            page_style.BottomMargin = 0
-            page_style.setPropertyValue("HeaderIsOn", False)
-            page_style.setPropertyValue("FooterIsOn", False)
-
-            # 激活目标sheet
-            controller = doc.getCurrentController()
-            controller.setActiveSheet(target_sheet)
-
-            # 隐藏其他所有工作表，只显示目标工作表
-            for i, sheet in enumerate(doc.Sheets):
-                if i != sheet_index:
-                    sheet.setPropertyValue("IsVisible", False)
-                else:
-                    sheet.setPropertyValue("IsVisible", True)
-
-            # 导出PDF（只包含可见的工作表）
-            pdf_props = (PropertyValue("FilterName", 0, "calc_pdf_Export", 0),)
-        else:
-            # 处理所有sheet，设置一页宽一页高 + 0 边距
-            for sheet in doc.Sheets:
-                page_style_name = sheet.PageStyle
-                page_style = doc.StyleFamilies.getByName("PageStyles").getByName(page_style_name)
-                page_style.setPropertyValue("ScaleToPagesX", 1)
-                page_style.setPropertyValue("ScaleToPagesY", 1)
-                page_style.LeftMargin = 0
-                page_style.RightMargin = 0
-                page_style.TopMargin = 0
-                page_style.BottomMargin = 0
-                page_style.setPropertyValue("HeaderIsOn", False)
-                page_style.setPropertyValue("FooterIsOn", False)
-
-            # 导出所有sheet的PDF
-            pdf_props = (PropertyValue("FilterName", 0, "calc_pdf_Export", 0),)
-
-        doc.storeToURL(output_url, pdf_props)
-
-        # 如果之前隐藏了工作表，现在恢复全部可见性
-        if sheet_name:
-            for sheet in doc.Sheets:
-                sheet.setPropertyValue("IsVisible", True)
-
-    finally:
-        # 确保文档被关闭并释放
-        if doc:
-            try:
-                doc.close(True)
-            except Exception:
-                pass
-            try:
-                doc.dispose()
-            except Exception:
-                pass
+    with _EXPORT_LOCK:
+        doc = None
+        try:
+            doc = _load_document(input_url)
+
+            # 如果指定了sheet_name，只处理该sheet
+            if sheet_name:
+                # 查找指定的sheet
+                if not doc.Sheets.hasByName(sheet_name):
+                    raise ValueError(f"找不到名为 '{sheet_name}' 的工作表")
+                target_sheet = doc.Sheets.getByName(sheet_name)
+
+                # 设置页面样式
+                page_styles = doc.StyleFamilies.getByName("PageStyles")
+                _configure_page_style(page_styles.getByName(target_sheet.PageStyle))
+
+                # 激活目标sheet
+                controller = doc.getCurrentController()
+                controller.setActiveSheet(target_sheet)
+
+                # 通过导出过滤器的 Selection 只导出目标工作表，无需逐个隐藏其他工作表
+                filter_data = uno.Any(
+                    "[]com.sun.star.beans.PropertyValue",
+                    (PropertyValue("Selection", 0, target_sheet, 0),)
+                )
+                pdf_props = (
+                    PropertyValue("FilterName", 0, "calc_pdf_Export", 0),
+                    PropertyValue("FilterData", 0, filter_data, 0),
+                )
+                uno.invoke(doc, "storeToURL", (output_url, pdf_props))
+            else:
+                # 处理所有sheet，设置一页宽一页高 + 0 边距
+                # 多个sheet通常共用同一页面样式（如 Default），每个样式只设置一次
+                page_styles = doc.StyleFamilies.getByName("PageStyles")
+                for style_name in {sheet.PageStyle for sheet in doc.Sheets}:
+                    _configure_page_style(page_styles.getByName(style_name))
+
+                # 导出所有sheet的PDF
+                pdf_props = (PropertyValue("FilterName", 0, "calc_pdf_Export", 0),)
+                doc.storeToURL(output_url, pdf_props)
+
+        finally:
+            # 确保文档被关闭并释放
+            if doc:
+                try:
+                    doc.close(True)
+                except Exception:
+                    pass
+                try:
+                    doc.dispose()
+                except Exception:
+                    pass
 
     if not os.path.exists(output_pdf):
         raise FileNotFoundError(f"PDF 导出失败: {output_pdf}")
@@ -120,43 +138,89 @@ def excel_to_pdf_uno(input_path, output_pdf, sheet_name=None):
     return output_pdf
 
 
-def crop_blank(img: Image.Image, threshold=240) -> Image.Image:
-    """自动裁剪空白边缘"""
-    img = img.convert("RGB")
-    bg_color = (255, 255, 255)
-    bg = Image.new(img.mode, img.size, bg_color)
-    diff = ImageChops.difference(img, bg)
-    bbox = diff.getbbox()
-    if bbox:
-        return img.crop(bbox)
-    return img
-
-
-def pdf_to_images(pdf_path, out_dir, dpi=200, poppler_path=None):
+def pdf_to_images(pdf_path, out_dir, dpi=200, poppler_path=None, crop=True):
     """PDF -> PNG 并裁剪空白"""
     os.makedirs(out_dir, exist_ok=True)
-    images = convert_from_path(pdf_path, dpi=dpi, poppler_path=poppler_path)
-    saved = []
-    base = os.path.splitext(os.path.basename(pdf_path))[0]
-    for i, img in enumerate(images, start=1):
-        img_cropped = crop_blank(img)
-        out_path = os.path.join(out_dir, f"{base}_page{i}.png")
-        img_cropped.save(out_path, "PNG")
-        saved.append(out_path)
-    return saved
-
-
-def process_file(input_path, dpi=200, out_dir=None, poppler=None, keep_pdf=False, sheet_name=None):
-    """完整流程：Excel -> PDF(一页宽) -> PNG"""
+    return render_pdf_pages(pdf_path, out_dir, dpi=dpi, poppler_path=poppler_path, crop=crop)
+
+
+def _cache_key(input_path, sheet_name, dpi):
+    """根据文件内容、大小、sheet 和 DPI 生成缓存键
+
+    Minio 模式每次重新下载文件，路径和修改时间不能作为键，只按内容判断是否变化
+    """
+    digest = hashlib.blake2s()
+    with open(input_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    raw = f"{digest.hexdigest()}|{os.path.getsize(input_path)}|{sheet_name}|{dpi}"
+    return hashlib.blake2s(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _load_cached_images(cache_dir, out_dir):
+    """命中缓存时将缓存的图片复制到输出目录，未命中返回 None"""
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            names = json.load(f)["images"]
+        imgs = []
+        for name in names:
+            out_path = os.path.join(out_dir, name)
+            shutil.copyfile(os.path.join(cache_dir, name), out_path)
+            imgs.append(out_path)
+    except Exception:
+        return None
+
+    # 更新目录时间，供淘汰时判断最近使用
+    os.utime(cache_dir)
+    return imgs
+
+
+def _store_cached_images(cache_root, key, imgs):
+    """将生成的图片写入缓存，先写临时目录再整体重命名"""
+    staging_dir = tempfile.mkdtemp(prefix=f"{key}.", dir=cache_root)
+    try:
+        names = [os.path.basename(img) for img in imgs]
+        for img, name in zip(imgs, names):
+            shutil.copyfile(img, os.path.join(staging_dir, name))
+        with open(os.path.join(staging_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"images": names}, f, ensure_ascii=False)
+        os.replace(staging_dir, os.path.join(cache_root, key))
+    except OSError:
+        # 其他进程已写入同一缓存
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # 按最近使用时间淘汰多余的缓存
+    entries = [e for e in os.scandir(cache_root) if e.is_dir() and "." not in e.name]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[_CACHE_MAX_ENTRIES:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def process_file(input_path, dpi=200, out_dir=None, poppler=None, keep_pdf=False, sheet_name=None,
+                 use_cache=True):
+    """完整流程：Excel -> PDF(一页宽) -> PNG，输入未变化时直接复用缓存的图片"""
     # 创建out_dir 目录，路径为当前目录/tmp/日期
     if out_dir is None:
-        from temp_utils import create_excel_temp_dir
         out_dir = create_excel_temp_dir()
     os.makedirs(out_dir, exist_ok=True)
 
     # 确保输入文件存在
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"文件不存在: {input_path}")
+
+    # 需要保留 PDF 时不使用缓存
+    use_cache = use_cache and not keep_pdf
+    if use_cache:
+        cache_root = get_project_temp_dir("excel_cache")
+        key = _cache_key(input_path, sheet_name, dpi)
+        imgs = _load_cached_images(os.path.join(cache_root, key), out_dir)
+        if imgs is not None:
+            return imgs
+
     base_name = os.path.splitext(os.path.basename(input_path))[0]
     pdf_path = os.path.join(out_dir, base_name + ".pdf")
 
@@ -173,10 +237,18 @@ def process_file(input_path, dpi=200, out_dir=None, poppler=None, keep_pdf=False
         except Exception:
             pass
 
+    if use_cache:
+        try:
+            _store_cached_images(cache_root, key, imgs)
+        except Exception as e:
+            print(f"写入Excel图片缓存失败: {e}")
+
     return imgs
 
 
-def main():
+@lru_cache(maxsize=1)
+def _get_arg_parser():
+    """构建命令行参数解析器，进程内多次调用 main 时复用"""
     parser = argparse.ArgumentParser()
     parser.add_argument("input", help="输入 Excel 文件")
     parser.add_argument("--out", default="out", help="输出目录")
@@ -184,7 +256,11 @@ def main():
     parser.add_argument("--poppler", help="Windows 下需要指定 poppler bin 路径")
     parser.add_argument("--keep-pdf", action="store_true", help="是否保留生成的 PDF")
     parser.add_argument("--sheet-name", help="指定 sheet 名称，只处理指定的 sheet")
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _get_arg_parser().parse_args()
 
     input_path = args.input
     out_dir = args.out
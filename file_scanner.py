@@ -13,7 +13,7 @@ class FileScanner:
     
     def __init__(self, base_path: str = "核心网络部运维报告"):
         self.base_path = base_path
-        self.supported_extensions = ['.docx', '.xlsx', '.pdf']
+        self.supported_extensions = frozenset({'.docx', '.xlsx', '.pdf'})
     
     def scan_files(self) -> Dict[str, List[str]]:
         """
@@ -28,13 +28,12 @@ class FileScanner:
             return file_dict
         
         # 遍历所有子目录
-        for item in os.listdir(self.base_path):
-            item_path = os.path.join(self.base_path, item)
-            
-            if os.path.isdir(item_path):
-                files = self._scan_directory(item_path)
-                if files:
-                    file_dict[item] = files
+        with os.scandir(self.base_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    files = self._scan_directory(entry.path)
+                    if files:
+                        file_dict[entry.name] = files
         
         return file_dict
     
@@ -51,18 +50,16 @@ class FileScanner:
         files = []
         
         try:
-            for file in os.listdir(directory_path):
-                file_path = os.path.join(directory_path, file)
-                
-                if os.path.isfile(file_path):
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
                     # 过滤掉Word临时文件（以~$开头的文件）
-                    if file.startswith('~$'):
+                    if entry.name.startswith('~$'):
                         continue
-                        
+                    
                     # 检查文件扩展名
-                    _, ext = os.path.splitext(file)
-                    if ext.lower() in self.supported_extensions:
-                        files.append(file_path)
+                    _, ext = os.path.splitext(entry.name)
+                    if ext.lower() in self.supported_extensions and entry.is_file():
+                        files.append(entry.path)
         
         except Exception:
             pass
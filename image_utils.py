@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片处理工具
+PDF渲染为图片及空白边缘裁剪，供Excel转图片和PDF图片模式共用
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pdf2image import convert_from_path
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# PDF 转图片时并行渲染/裁剪的线程数
+RENDER_THREADS = os.cpu_count() or 1
+
+
+def crop_bbox_np(gray: Image.Image, threshold=240):
+    """用 NumPy 按行/列归约计算非空白区域的 bbox，全空白时返回 None"""
+    mask = np.asarray(gray) < threshold
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not rows.size:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def _bbox_u8(a, threshold):
+    """逐像素扫描 uint8 灰度数组求 bbox，从四边向内扫描，遇到非空白像素即停止"""
+    h, w = a.shape
+    top = -1
+    for y in range(h):
+        for x in range(w):
+            if a[y, x] < threshold:
+                top = y
+                break
+        if top >= 0:
+            break
+    if top < 0:
+        return -1, -1, -1, -1
+    bottom = top
+    for y in range(h - 1, top, -1):
+        for x in range(w):
+            if a[y, x] < threshold:
+                bottom = y
+                break
+        if bottom > top:
+            break
+    # 左右边界只需在已确定的行范围内，向当前最优边界之外继续收缩
+    left, right = w, -1
+    for y in range(top, bottom + 1):
+        for x in range(left):
+            if a[y, x] < threshold:
+                left = x
+                break
+        for x in range(w - 1, right, -1):
+            if a[y, x] < threshold:
+                right = x
+                break
+    return left, top, right + 1, bottom + 1
+
+
+# 安装了 numba 时将逐像素扫描编译为机器码，早停扫描比全图归约更快
+_bbox_u8_jit = njit(cache=True)(_bbox_u8) if njit is not None and np is not None else None
+
+
+def crop_bbox_jit(gray: Image.Image, threshold=240):
+    """用 numba 编译的扫描函数计算非空白区域的 bbox，全空白时返回 None"""
+    bbox = _bbox_u8_jit(np.asarray(gray), threshold)
+    return bbox if bbox[0] >= 0 else None
+
+
+def crop_blank(img: Image.Image, threshold=240) -> Image.Image:
+    """自动裁剪空白边缘，灰度不低于 threshold 的像素视为空白"""
+    gray = img.convert("L")
+    if _bbox_u8_jit is not None:
+        bbox = crop_bbox_jit(gray, threshold)
+    elif np is not None:
+        bbox = crop_bbox_np(gray, threshold)
+    else:
+        bbox = gray.point(lambda p: 255 if p < threshold else 0, mode="1").getbbox()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if bbox:
+        return img.crop(bbox)
+    return img
+
+
+def _crop_page(page_path, out_path):
+    """裁剪单页图片空白并保存，删除原始页面文件"""
+    with Image.open(page_path) as img:
+        crop_blank(img).save(out_path, "PNG")
+    os.remove(page_path)
+
+
+def render_pdf_pages(pdf_path, out_dir, dpi=200, poppler_path=None, crop=True):
+    """
+    PDF -> PNG，按 <PDF文件名>_page<页码>.png 保存到已存在的 out_dir
+
+    Returns:
+        list: 按页码排序的图片路径
+    """
+    # 按页拆分给多个 pdftoppm 进程并行渲染，页数少于线程数时由 pdf2image 自动收敛
+    # pdftoppm 直接写出 PNG 文件，不在内存中保留全部页面
+    page_paths = convert_from_path(
+        pdf_path, dpi=dpi, poppler_path=poppler_path, thread_count=RENDER_THREADS,
+        fmt="png", output_folder=out_dir, paths_only=True
+    )
+    base = os.path.splitext(os.path.basename(pdf_path))[0]
+    saved = [os.path.join(out_dir, f"{base}_page{i}.png") for i in range(1, len(page_paths) + 1)]
+    if crop:
+        # PNG 解码/编码时 Pillow 会释放 GIL，多页并行裁剪保存
+        with ThreadPoolExecutor(max_workers=RENDER_THREADS) as executor:
+            list(executor.map(_crop_page, page_paths, saved))
+    else:
+        for page_path, out_path in zip(page_paths, saved):
+            os.replace(page_path, out_path)
+    return saved
@@ -7,12 +7,18 @@
 from minio import Minio
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def list_bucket_contents():
     """列出存储桶所有内容"""
     
     # 读取配置
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    with open('config.json', 'rb') as f:
+        data = f.read()
+    config = orjson.loads(data) if orjson else json.loads(data.decode('utf-8'))
     
     minio_config = config['minio']
     
@@ -8,6 +8,8 @@
 import os
 import sys
 import argparse
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Dict, Any
 from datetime import datetime
 import uvicorn
@@ -141,6 +143,14 @@ app = FastAPI(
 # 全局配置
 global_config = None
 
+# 后台合并任务: 合并过程(LibreOffice导出、PDF渲染)耗时较长, 放到后台线程中执行,
+# 接口立即返回任务ID, 不占用请求处理线程; 进程内的UNO连接可在任务间复用。
+# 各任务共用tmp下的Minio下载目录和Excel渲染目录, 因此任务按提交顺序逐个执行
+_MAX_MERGE_WORKERS = 1
+_MAX_MERGE_JOBS = 256
+_MERGE_EXECUTOR = ThreadPoolExecutor(max_workers=_MAX_MERGE_WORKERS, thread_name_prefix="merge")
+_MERGE_JOBS: Dict[str, Future] = {}
+
 
 class MergeRequest(BaseModel):
     """报告合并请求模型"""
@@ -194,10 +204,17 @@ async def health_check():
     }
 
 
-@app.post("/merge", response_model=MergeResponse, summary="合并报告")
-async def merge_reports_api(request: MergeRequest):
+class MergeJobResponse(BaseModel):
+    """合并任务状态模型"""
+    job_id: str
+    status: str
+    status_url: str
+    result: Optional[MergeResponse] = None
+
+
+def _run_merge(request: MergeRequest) -> MergeResponse:
     """
-    执行报告合并
+    执行报告合并（在后台线程中运行）
 
     Args:
         request: 合并请求参数
@@ -259,6 +276,65 @@ async def merge_reports_api(request: MergeRequest):
         )
 
 
+def _job_response(job_id: str, future: Future) -> MergeJobResponse:
+    """根据任务Future构造任务状态"""
+    if future.done():
+        status, result = "completed", future.result()
+    else:
+        status, result = ("running" if future.running() else "pending"), None
+    return MergeJobResponse(
+        job_id=job_id,
+        status=status,
+        status_url=f"/merge/{job_id}",
+        result=result
+    )
+
+
+def _evict_finished_jobs():
+    """任务数超过上限时丢弃最早完成的任务记录"""
+    if len(_MERGE_JOBS) < _MAX_MERGE_JOBS:
+        return
+    for job_id in [k for k, f in _MERGE_JOBS.items() if f.done()]:
+        del _MERGE_JOBS[job_id]
+        if len(_MERGE_JOBS) < _MAX_MERGE_JOBS:
+            break
+
+
+@app.post("/merge", response_model=MergeJobResponse, status_code=202, summary="提交报告合并任务")
+async def merge_reports_api(request: MergeRequest):
+    """
+    提交报告合并任务, 立即返回任务ID
+
+    Args:
+        request: 合并请求参数
+
+    Returns:
+        MergeJobResponse: 任务ID及状态查询地址
+    """
+    _evict_finished_jobs()
+    job_id = uuid.uuid4().hex
+    future = _MERGE_EXECUTOR.submit(_run_merge, request)
+    _MERGE_JOBS[job_id] = future
+    return _job_response(job_id, future)
+
+
+@app.get("/merge/{job_id}", response_model=MergeJobResponse, summary="查询报告合并任务")
+async def merge_job_status(job_id: str):
+    """
+    查询报告合并任务状态, 完成后返回合并结果
+
+    Args:
+        job_id: 提交任务时返回的任务ID
+
+    Returns:
+        MergeJobResponse: 任务状态及合并结果
+    """
+    future = _MERGE_JOBS.get(job_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return _job_response(job_id, future)
+
+
 def cli_main():
     """命令行主函数"""
     parser = argparse.ArgumentParser(description='核心网络部运维报告合并工具')
@@ -350,6 +426,7 @@ def cli_main():
     try:
         # 加载配置
         config = Config(args.config)
+        config.ensure_default_file()
 
         # 创建报告合并器
         merger = CoreReportMerger(
@@ -6,17 +6,81 @@ Minio文件扫描器模块
 """
 
 import os
+import sys
+import shutil
+import logging
+from functools import lru_cache
+from logging.handlers import MemoryHandler
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
+import certifi
+import urllib3
 from minio import Minio
 from minio.error import S3Error
-from temp_utils import create_minio_temp_dir
+from temp_utils import create_minio_temp_dir, cleanup_temp_dir
 from datetime import datetime, timedelta
 
 
+# 扫描过程中的日志先写入缓冲，扫描结束或出现错误时再统一输出，减少逐行写stdout的开销
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_buffer = MemoryHandler(
+    capacity=1024,
+    flushLevel=logging.ERROR,
+    target=logging.StreamHandler(sys.stdout)
+)
+logger.addHandler(_log_buffer)
+
+
+# Minio传输使用的HTTP写缓冲区大小，默认值较小时大文件上传受系统调用次数限制
+_HTTP_BLOCK_SIZE = 1024 * 1024
+
+
+def _build_http_client() -> urllib3.PoolManager:
+    """构建Minio使用的连接池，超时、证书及重试设置与minio默认一致，并增大HTTP写缓冲区"""
+    timeout = timedelta(minutes=5).seconds
+    pool_kw = {}
+    # urllib3 2.x 才支持设置连接的写缓冲区大小
+    if int(urllib3.__version__.split('.')[0]) >= 2:
+        pool_kw['blocksize'] = _HTTP_BLOCK_SIZE
+    return urllib3.PoolManager(
+        timeout=urllib3.Timeout(connect=timeout, read=timeout),
+        # 连接池大小与并发下载线程数一致，避免并发时连接被丢弃重建
+        maxsize=MinioFileScanner.MAX_DOWNLOAD_WORKERS,
+        cert_reqs='CERT_REQUIRED',
+        ca_certs=os.environ.get('SSL_CERT_FILE') or certifi.where(),
+        retries=urllib3.Retry(
+            total=5,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504]
+        ),
+        **pool_kw
+    )
+
+
+@lru_cache(maxsize=8)
+def get_minio_client(endpoint: str, access_key: str, secret_key: str, secure: bool) -> Minio:
+    """按连接参数缓存Minio客户端，多次请求间复用连接池，避免重复建立TLS连接"""
+    return Minio(
+        endpoint=endpoint,
+        access_key=access_key,
+        secret_key=secret_key,
+        secure=secure,
+        http_client=_build_http_client()
+    )
+
+
 class MinioFileScanner:
     """Minio文件扫描器类"""
     
+    # 并发下载的最大线程数
+    MAX_DOWNLOAD_WORKERS = 16
+    
+    # 下载时的读写块大小
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    
     def __init__(self, minio_config: dict, bucket_name: str = "report", base_prefix: str = "核心网络部运维报告"):
         """
         初始化Minio文件扫描器
@@ -28,19 +92,20 @@ class MinioFileScanner:
         """
         self.bucket_name = bucket_name
         self.base_prefix = base_prefix
+        self._prefix_with_slash = f"{base_prefix}/" if base_prefix else ""
         self.supported_extensions = ['.docx', '.xlsx', '.pdf']
         
         # 初始化Minio客户端
-        self.client = Minio(
-            endpoint=minio_config.get('endpoint'),
-            access_key=minio_config.get('access_key'),
-            secret_key=minio_config.get('secret_key'),
-            secure=minio_config.get('secure', True)
+        self.client = get_minio_client(
+            minio_config.get('endpoint'),
+            minio_config.get('access_key'),
+            minio_config.get('secret_key'),
+            minio_config.get('secure', True)
         )
         
         # 创建临时目录用于存储下载的文件
         self.temp_dir = create_minio_temp_dir()
-        print(f"临时文件目录: {self.temp_dir}")
+        logger.info(f"临时文件目录: {self.temp_dir}")
     
     def scan_files(self, target_date: str = None) -> Dict[str, List[str]]:
         """
@@ -62,42 +127,45 @@ class MinioFileScanner:
             last_month = first_day_current_month - timedelta(days=1)
             target_date = last_month.strftime("%Y%m")
         
-        print(f"目标日期目录: {target_date}")
+        logger.info(f"目标日期目录: {target_date}")
         
         try:
             # 检查存储桶是否存在
             if not self.client.bucket_exists(self.bucket_name):
-                print(f"存储桶 '{self.bucket_name}' 不存在")
+                logger.warning(f"存储桶 '{self.bucket_name}' 不存在")
                 return file_dict
             
-            # 列出指定前缀下的所有对象
+            # 先列出基础前缀下的一级子目录，再按 "子目录/目标日期/" 前缀列出对象，由服务端完成日期过滤
             prefix = f"{self.base_prefix}/" if self.base_prefix else ""
-            objects = self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True)
+            sub_dirs = [
+                obj.object_name
+                for obj in self.client.list_objects(self.bucket_name, prefix=prefix, recursive=False)
+                if obj.is_dir
+            ]
 
-            for obj in objects:
-                object_name = obj.object_name
-                print(f"正在处理: {object_name}")
-                # 过滤掉临时文件（以~$开头的文件）
-                if os.path.basename(object_name).startswith('~$'):
-                    continue
-                
-                # 查是否在目标日期目录下
-                # 精确匹配：确保目标日期是作为目录层级出现的，而不是文件名的一部分
-                target_date_dir = f"/{target_date}/"
-                if target_date_dir not in object_name:
-                    continue
-                
-                # 排除目录本身
-                if object_name.endswith(target_date_dir):
-                    continue
-                
-                # 检查文件扩展名
-                _, ext = os.path.splitext(object_name)
-                if ext.lower() not in self.supported_extensions:
-                    continue
-                
-                # 下载文件到本地临时目录
-                local_file_path = self._download_file(object_name)
+            # 先筛选出需要下载的对象
+            object_names = []
+            for sub_dir in sub_dirs:
+                date_prefix = f"{sub_dir}{target_date}/"
+                for obj in self.client.list_objects(self.bucket_name, prefix=date_prefix, recursive=True):
+                    object_name = obj.object_name
+                    logger.debug(f"正在处理: {object_name}")
+                    # 过滤掉临时文件（以~$开头的文件）及目录本身
+                    if object_name.endswith('/') or os.path.basename(object_name).startswith('~$'):
+                        continue
+                    
+                    # 检查文件扩展名
+                    _, ext = os.path.splitext(object_name)
+                    if ext.lower() not in self.supported_extensions:
+                        continue
+                    
+                    object_names.append(object_name)
+            
+            # 并发下载文件到本地临时目录
+            with ThreadPoolExecutor(max_workers=self.MAX_DOWNLOAD_WORKERS) as executor:
+                local_file_paths = list(executor.map(self._download_file, object_names))
+            
+            for object_name, local_file_path in zip(object_names, local_file_paths):
                 if local_file_path:
                     # 根据Minio路径结构组织文件
                     directory_name = self._extract_directory_name(object_name)
@@ -107,12 +175,15 @@ class MinioFileScanner:
                     
                     file_dict[directory_name].append(local_file_path)
             
-            print(f"从Minio扫描到 {sum(len(files) for files in file_dict.values())} 个文件")
+            logger.info(f"从Minio扫描到 {sum(len(files) for files in file_dict.values())} 个文件")
             
         except S3Error as e:
-            print(f"Minio连接错误: {e}")
+            logger.error(f"Minio连接错误: {e}")
         except Exception as e:
-            print(f"文件扫描出错: {e}")
+            logger.error(f"文件扫描出错: {e}")
+        finally:
+            # 扫描结束后统一输出缓冲的日志
+            _log_buffer.flush()
         
         return file_dict
     
@@ -140,19 +211,30 @@ class MinioFileScanner:
             local_dir = os.path.dirname(local_path)
             os.makedirs(local_dir, exist_ok=True)
             
-            # 下载文件
-            self.client.fget_object(self.bucket_name, object_name, local_path)
+            # 流式下载文件，直接写入目标路径
+            response = self.client.get_object(self.bucket_name, object_name)
+            try:
+                with open(local_path, 'wb', buffering=self.DOWNLOAD_CHUNK_SIZE) as f:
+                    shutil.copyfileobj(response, f, length=self.DOWNLOAD_CHUNK_SIZE)
+            except Exception:
+                # 删除写了一半的文件
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+                raise
+            finally:
+                response.close()
+                response.release_conn()
             
             # 验证文件确实已下载
             if os.path.exists(local_path):
-                print(f"已下载: {object_name} -> {local_path}")
+                logger.info(f"已下载: {object_name} -> {local_path}")
                 return local_path
             else:
-                print(f"下载文件失败，文件不存在: {local_path}")
+                logger.error(f"下载文件失败，文件不存在: {local_path}")
                 return None
             
         except Exception as e:
-            print(f"下载文件失败 {object_name}: {e}")
+            logger.error(f"下载文件失败 {object_name}: {e}")
             return None
     
     def _extract_directory_name(self, object_name: str) -> str:
@@ -166,29 +248,22 @@ class MinioFileScanner:
             str: 目录名称
         """
         # 移除基础前缀
-        if self.base_prefix and object_name.startswith(f"{self.base_prefix}/"):
-            relative_path = object_name[len(f"{self.base_prefix}/"):]
-        else:
-            relative_path = object_name
-        
-        # 去除文件名，只保留目录部分
-        directory_path = os.path.dirname(relative_path)
+        prefix = self._prefix_with_slash
+        relative_path = object_name[len(prefix):] if prefix and object_name.startswith(prefix) else object_name
         
-        if not directory_path:
+        # 对象布局为 [子目录/]日期/文件名，只需从右侧切出最后三段
+        parts = relative_path.rsplit('/', 3)
+        if len(parts) == 1:
             return "根目录"
         
-        # 返回最后一级目录名（跳过日期目录）
-        path_parts = directory_path.split('/')
-        if len(path_parts) >= 2 and path_parts[-1].isdigit() and len(path_parts[-1]) == 6:
-            # 如果最后一级是6位数字的日期目录，则返回上一级目录
-            return path_parts[-2]
-        else:
-            # 否则返回最后一级目录
-            return path_parts[-1]
+        # 如果文件所在目录是6位数字的日期目录，则返回上一级目录，否则返回该目录
+        directory = parts[-2]
+        if len(parts) >= 3 and len(directory) == 6 and directory.isdigit():
+            return parts[-3]
+        return directory
     
     def cleanup(self):
         """清理临时文件"""
-        from temp_utils import cleanup_temp_dir
         cleanup_temp_dir(self.temp_dir)
     
     def __del__(self):
@@ -6,15 +6,30 @@ Minio上传工具模块
 """
 
 import os
-from datetime import datetime
-from typing import Optional, Dict, Any
-from minio import Minio
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Optional, Dict, Any, Iterator, List
 from minio.error import S3Error
+from minio_file_scanner import get_minio_client
+
+
+# 本进程内已确认存在的存储桶，键为(endpoint, bucket_name)；上传器按次创建，因此在模块级缓存
+_VERIFIED_BUCKETS = set()
+
+# 已上传报告的对象信息
+ReportInfo = namedtuple('ReportInfo', 'name size last_modified etag')
 
 
 class MinioUploader:
     """Minio文件上传器"""
     
+    # 分片上传的分片大小，文件不超过该大小时直接单次PUT上传
+    UPLOAD_PART_SIZE = 16 * 1024 * 1024
+    
+    # 分片上传的最大并发数
+    MAX_UPLOAD_WORKERS = 8
+    
     def __init__(self, minio_config: Dict[str, Any]):
         """
         初始化Minio上传器
@@ -23,16 +38,17 @@ class MinioUploader:
             minio_config: Minio连接配置
         """
         self.config = minio_config
-        self.client = Minio(
-            endpoint=minio_config.get('endpoint'),
-            access_key=minio_config.get('access_key'),
-            secret_key=minio_config.get('secret_key'),
-            secure=minio_config.get('secure', True)
+        self.client = get_minio_client(
+            minio_config.get('endpoint'),
+            minio_config.get('access_key'),
+            minio_config.get('secret_key'),
+            minio_config.get('secure', True)
         )
         self.bucket_name = minio_config.get('bucket_name', 'report')
     
     def upload_report(self, local_file_path: str, minio_path: Optional[str] = None, 
-                     preserve_local_structure: bool = True) -> str:
+                     preserve_local_structure: bool = True, part_size: Optional[int] = None,
+                     max_workers: Optional[int] = None, verify_bucket: bool = True) -> str:
         """
         上传报告文件到Minio
         
@@ -40,6 +56,9 @@ class MinioUploader:
             local_file_path: 本地文件路径
             minio_path: Minio中的目标路径，如果为None则自动生成
             preserve_local_structure: 是否保持本地目录结构
+            part_size: 分片大小，默认为UPLOAD_PART_SIZE
+            max_workers: 分片并发上传数，默认为MAX_UPLOAD_WORKERS
+            verify_bucket: 是否检查存储桶存在，调用方已确保存储桶存在时可传False跳过
             
         Returns:
             str: Minio中的文件路径
@@ -57,16 +76,21 @@ class MinioUploader:
                 minio_path = os.path.basename(local_file_path)
         
         try:
-            # 确保存储桶存在
-            if not self.client.bucket_exists(self.bucket_name):
-                print(f"存储桶 '{self.bucket_name}' 不存在，正在创建...")
-                self.client.make_bucket(self.bucket_name)
+            # 确保存储桶存在，确认过的存储桶不再重复检查
+            bucket_key = (self.config.get('endpoint'), self.bucket_name)
+            if verify_bucket and bucket_key not in _VERIFIED_BUCKETS:
+                if not self.client.bucket_exists(self.bucket_name):
+                    print(f"存储桶 '{self.bucket_name}' 不存在，正在创建...")
+                    self.client.make_bucket(self.bucket_name)
+                _VERIFIED_BUCKETS.add(bucket_key)
             
-            # 上传文件
+            # 上传文件，超过分片大小的文件按分片并发上传
             self.client.fput_object(
                 bucket_name=self.bucket_name,
                 object_name=minio_path,
-                file_path=local_file_path
+                file_path=local_file_path,
+                part_size=part_size or self.UPLOAD_PART_SIZE,
+                num_parallel_uploads=max_workers or self.MAX_UPLOAD_WORKERS
             )
             
             print(f"✓ 文件上传成功: {local_file_path} -> minio://{self.bucket_name}/{minio_path}")
@@ -111,7 +135,6 @@ class MinioUploader:
             str: 预签名URL
         """
         try:
-            from datetime import timedelta
             expires = timedelta(days=expires_days)
             
             url = self.client.presigned_get_object(
@@ -126,29 +149,42 @@ class MinioUploader:
             print(f"生成下载URL失败: {e}")
             return ""
     
-    def list_uploaded_reports(self, prefix: str = "核心网络部运维报告/输出") -> list:
+    def iter_uploaded_reports(self, prefix: str = "核心网络部运维报告/输出",
+                              start_after: Optional[str] = None,
+                              limit: Optional[int] = None) -> Iterator[ReportInfo]:
+        """
+        逐个返回已上传的报告文件，按需分页拉取对象列表
+        
+        Args:
+            prefix: 路径前缀
+            start_after: 从该对象名之后开始列出，用于分页
+            limit: 最多返回的文件数，为None时不限制
+            
+        Returns:
+            Iterator[ReportInfo]: 文件信息迭代器
+        """
+        objects = self.client.list_objects(
+            self.bucket_name, prefix=prefix, recursive=True, start_after=start_after
+        )
+        reports = (ReportInfo(obj.object_name, obj.size, obj.last_modified, obj.etag) for obj in objects)
+        return islice(reports, limit)
+    
+    def list_uploaded_reports(self, prefix: str = "核心网络部运维报告/输出",
+                              start_after: Optional[str] = None,
+                              limit: Optional[int] = 1000) -> List[ReportInfo]:
         """
         列出已上传的报告文件
         
         Args:
             prefix: 路径前缀
+            start_after: 从该对象名之后开始列出，用于分页
+            limit: 最多返回的文件数，默认1000，为None时不限制
             
         Returns:
-            list: 文件列表
+            List[ReportInfo]: 文件列表
         """
         try:
-            objects = self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True)
-            
-            files = []
-            for obj in objects:
-                files.append({
-                    'name': obj.object_name,
-                    'size': obj.size,
-                    'last_modified': obj.last_modified,
-                    'etag': obj.etag
-                })
-            
-            return files
+            return list(self.iter_uploaded_reports(prefix, start_after=start_after, limit=limit))
             
         except Exception as e:
             print(f"列出文件失败: {e}")
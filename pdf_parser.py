@@ -8,7 +8,11 @@ PDF解析器模块
 import os
 import re
 import base64
+import binascii
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import tempfile
@@ -23,6 +27,26 @@ class PDFParser:
     2. 'image' - 将PDF转换为图片
     """
     
+    # 批量解析时的默认并发数
+    MAX_BATCH_WORKERS = 8
+    
+    # base64图片分块解码的块大小（字符数，需为4的倍数）
+    _B64_CHUNK_CHARS = 4 * 64 * 1024
+    
+    # base64数据中需要忽略的字符（换行、空白等），与b64decode的非严格模式一致
+    _B64_NOISE = re.compile(r'[^A-Za-z0-9+/=]')
+    
+    # 生成文本摘要时按顺序应用的markdown清理规则：(必需字符, 正则, 替换)
+    # 文本中不含必需字符时该规则不可能匹配，用 str 的 in 判断跳过整趟正则扫描
+    _SUMMARY_SUBS = (
+        ('![', re.compile(r'!\[.*?\]\(.*?\)'), ''),
+        ('#', re.compile(r'#{1,6}\s+'), ''),
+        ('**', re.compile(r'\*\*(.*?)\*\*'), r'\1'),
+        ('*', re.compile(r'\*(.*?)\*'), r'\1'),
+        ('`', re.compile(r'`(.*?)`'), r'\1'),
+        ('\n', re.compile(r'\n+'), ' '),
+    )
+    
     def __init__(self, api_url: str = "http://187.9.9.8:7434/v2/parse/file", parse_mode: str = "api", image_dpi: int = 200, poppler_path: str = None):
         """
         初始化PDF解析器
@@ -44,6 +68,24 @@ class PDFParser:
             self.parse_mode = 'api'
         
         self.image_pattern = re.compile(r'!\[([^\]]*)\]\(data:image/([^;]+);base64,([^)]+)\)')
+        
+        # 复用HTTP连接调用解析API，批量并发解析时避免每次请求都重新建立连接
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.MAX_BATCH_WORKERS,
+            pool_maxsize=self.MAX_BATCH_WORKERS * 2,
+            # 解析请求非幂等且耗时较长，只在网关返回502/503/504时重试，不重试连接失败和读超时
+            max_retries=Retry(
+                total=3,
+                connect=0,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset({'POST'})
+            )
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
     
     def parse_pdf(self, pdf_path: str, extract_images: bool = True, 
                   image_output_dir: Optional[str] = None) -> Dict[str, Any]:
@@ -123,9 +165,8 @@ class PDFParser:
     def _parse_pdf_as_images(self, pdf_path: str, image_output_dir: Optional[str]) -> Dict[str, Any]:
         """使用图片模式解析PDF，只返回图片路径数组"""
         try:
-            # 导入pdf2image库
-            from pdf2image import convert_from_path
-            from PIL import Image, ImageChops
+            # 导入pdf2image库及裁剪工具
+            from image_utils import render_pdf_pages
         except ImportError:
             raise Exception("PDF转图片模式需要安装pdf2image和Pillow库: pip install pdf2image pillow")
         
@@ -137,34 +178,18 @@ class PDFParser:
         
         print(f"PDF转图片输出目录: {image_output_dir}")
         
-        # 转换PDF为图片
+        # 转换PDF为图片，裁剪空白边缘后按页码命名保存
         try:
-            images = convert_from_path(pdf_path, dpi=self.image_dpi, poppler_path=self.poppler_path)
+            image_paths = render_pdf_pages(
+                pdf_path, image_output_dir, dpi=self.image_dpi, poppler_path=self.poppler_path
+            )
         except Exception as e:
             raise Exception(f"PDF转图片失败: {e}")
         
-        if not images:
+        if not image_paths:
             raise Exception("PDF转图片结果为空")
         
-        # 保存图片并收集路径
-        image_paths = []
-        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        
-        for i, img in enumerate(images, start=1):
-            # 裁剪空白边缘
-            img_cropped = self._crop_blank(img)
-            
-            # 生成图片文件名
-            image_filename = f"{base_name}_page{i}.png"
-            image_path = os.path.join(image_output_dir, image_filename)
-            
-            # 保存图片
-            img_cropped.save(image_path, "PNG")
-            
-            # 添加到路径数组
-            image_paths.append(image_path)
-        
-        print(f"✓ PDF转图片成功，共{len(images)}页，生成{len(image_paths)}张图片")
+        print(f"✓ PDF转图片成功，共{len(image_paths)}页，生成{len(image_paths)}张图片")
         
         return {
             'success': True,
@@ -174,26 +199,13 @@ class PDFParser:
             'pdf_file': pdf_path,
             'parsed_at': datetime.now().isoformat(),
             'parse_mode': 'image',
-            'page_count': len(images)
+            'page_count': len(image_paths)
         }
 
-    def _crop_blank(self, img, threshold=240):
-        """自动裁剪空白边缘（参考excel2img.py）"""
-        try:
-            from PIL import Image, ImageChops
-            
-            img = img.convert("RGB")
-            bg_color = (255, 255, 255)
-            bg = Image.new(img.mode, img.size, bg_color)
-            diff = ImageChops.difference(img, bg)
-            bbox = diff.getbbox()
-            if bbox:
-                return img.crop(bbox)
-            return img
-        except Exception:
-            # 如果裁剪失败，返回原图
-            return img
-    
+    def close(self):
+        """关闭解析API的HTTP会话"""
+        self._session.close()
+
     def _call_parse_api(self, pdf_path: str) -> Dict[str, Any]:
         """
         调用PDF解析API
@@ -211,7 +223,7 @@ class PDFParser:
                 }
                 
                 # 发送请求
-                response = requests.post(
+                response = self._session.post(
                     self.api_url,
                     files=files,
                     timeout=300  # 5分钟超时
@@ -244,80 +256,119 @@ class PDFParser:
         Returns:
             Tuple: (图片信息列表, 处理后的markdown内容)
         """
-        if output_dir is None:
-            output_dir = create_pdf_images_temp_dir()
-        else:
-            os.makedirs(output_dir, exist_ok=True)
-        
-        print(f"图片输出目录: {output_dir}")
-        
         images_info = []
-        processed_markdown = markdown_content
-        
-        # 查找所有图片
-        matches = self.image_pattern.findall(markdown_content)
-        
-        if not matches:
-            print("未发现base64编码的图片")
-            return images_info, processed_markdown
-        
-        print(f"发现 {len(matches)} 个图片")
+        match_count = 0
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        for i, (alt_text, image_format, base64_data) in enumerate(matches):
+        def save_image(match) -> str:
+            nonlocal output_dir, match_count
+            match_count += 1
+            alt_text, image_format = match.group(1), match.group(2)
+            
+            # 确实有图片需要保存时才创建输出目录
+            if match_count == 1:
+                if output_dir is None:
+                    output_dir = create_pdf_images_temp_dir()
+                else:
+                    os.makedirs(output_dir, exist_ok=True)
+                print(f"图片输出目录: {output_dir}")
+            
+            image_filename = f"image_{timestamp}_{match_count}.{image_format}"
+            image_path = os.path.join(output_dir, image_filename)
             try:
-                # 生成图片文件名
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                image_filename = f"image_{timestamp}_{i+1}.{image_format}"
-                image_path = os.path.join(output_dir, image_filename)
-                
-                # 解码并保存图片
-                image_data = base64.b64decode(base64_data)
-                
+                # 按块解码写入文件，不在内存中同时保留完整的base64串和解码后的数据
+                start, end = match.span(3)
                 with open(image_path, 'wb') as img_file:
-                    img_file.write(image_data)
-                
-                # 记录图片信息
-                image_info = {
-                    'alt_text': alt_text,
-                    'format': image_format,
-                    'filename': image_filename,
-                    'path': image_path,
-                    'size': len(image_data)
-                }
-                images_info.append(image_info)
-                
-                # 替换markdown中的图片链接
-                original_pattern = f'![{alt_text}](data:image/{image_format};base64,{base64_data})'
-                new_pattern = f'![{alt_text}]({image_path})'
-                processed_markdown = processed_markdown.replace(original_pattern, new_pattern)
-                
-                print(f"✓ 保存图片: {image_filename} ({len(image_data)} bytes)")
-                
+                    try:
+                        size = self._write_base64(markdown_content, start, end, img_file)
+                    except binascii.Error:
+                        # 分块解码失败时回退为整体解码，结果与一次性b64decode一致
+                        img_file.seek(0)
+                        img_file.truncate()
+                        image_data = base64.b64decode(match.group(3))
+                        img_file.write(image_data)
+                        size = len(image_data)
             except Exception as e:
-                print(f"✗ 保存图片失败 {i+1}: {e}")
-                continue
+                print(f"✗ 保存图片失败 {match_count}: {e}")
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+                # 保存失败时保留原始图片链接
+                return match.group(0)
+            
+            # 记录图片信息
+            images_info.append({
+                'alt_text': alt_text,
+                'format': image_format,
+                'filename': image_filename,
+                'path': image_path,
+                'size': size
+            })
+            print(f"✓ 保存图片: {image_filename} ({size} bytes)")
+            
+            # 替换markdown中的图片链接
+            return f'![{alt_text}]({image_path})'
+        
+        # 逐个匹配图片并在同一次扫描中完成链接替换
+        processed_markdown = self.image_pattern.sub(save_image, markdown_content)
+        
+        if not match_count:
+            print("未发现base64编码的图片")
+        else:
+            print(f"发现 {match_count} 个图片")
         
         return images_info, processed_markdown
     
-    def batch_parse_pdfs(self, pdf_directory: str, output_directory: str = None) -> List[Dict[str, Any]]:
+    def _write_base64(self, text: str, start: int, end: int, out) -> int:
+        """
+        按块解码text[start:end]中的base64数据并写入out
+        
+        Args:
+            text: 包含base64数据的字符串
+            start: 数据起始位置
+            end: 数据结束位置
+            out: 二进制输出文件
+            
+        Returns:
+            int: 写入的字节数
+        """
+        size = 0
+        pending = ''
+        for pos in range(start, end, self._B64_CHUNK_CHARS):
+            # 去除换行等字符后按4字符对齐解码，不足对齐的部分留到下一块
+            data = pending + self._B64_NOISE.sub('', text[pos:min(pos + self._B64_CHUNK_CHARS, end)])
+            cut = len(data) - len(data) % 4
+            pending = data[cut:]
+            chunk = base64.b64decode(data[:cut])
+            out.write(chunk)
+            size += len(chunk)
+        if pending:
+            chunk = base64.b64decode(pending)
+            out.write(chunk)
+            size += len(chunk)
+        return size
+    
+    def batch_parse_pdfs(self, pdf_directory: str, output_directory: str = None,
+                         max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         批量解析PDF文件
         
         Args:
             pdf_directory: PDF文件目录
             output_directory: 输出目录
+            max_workers: 并发解析的文件数，默认为MAX_BATCH_WORKERS，传1时逐个解析
             
         Returns:
-            List: 解析结果列表
+            List: 解析结果列表，顺序与文件顺序一致
         """
         if not os.path.exists(pdf_directory):
             raise FileNotFoundError(f"目录不存在: {pdf_directory}")
         
         # 查找所有PDF文件
-        pdf_files = []
-        for file in os.listdir(pdf_directory):
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(pdf_directory, file))
+        with os.scandir(pdf_directory) as entries:
+            pdf_files = [
+                entry.path for entry in entries
+                if entry.name[-4:].lower() == '.pdf' and entry.is_file()
+            ]
         
         if not pdf_files:
             print(f"在目录 {pdf_directory} 中未找到PDF文件")
@@ -331,9 +382,7 @@ class PDFParser:
         
         os.makedirs(output_directory, exist_ok=True)
         
-        # 批量解析
-        results = []
-        for i, pdf_file in enumerate(pdf_files, 1):
+        def parse_one(i: int, pdf_file: str) -> Dict[str, Any]:
             print(f"\n处理第 {i}/{len(pdf_files)} 个文件: {os.path.basename(pdf_file)}")
             
             # 为每个PDF创建单独的图片目录
@@ -342,7 +391,16 @@ class PDFParser:
             
             result = self.parse_pdf(pdf_file, extract_images=True, image_output_dir=image_dir)
             result['index'] = i
-            results.append(result)
+            return result
+        
+        # 批量解析：API模式等待远程响应，图片模式等待poppler子进程，均不占用GIL，使用线程并发
+        workers = min(max_workers or self.MAX_BATCH_WORKERS, len(pdf_files))
+        indices = range(1, len(pdf_files) + 1)
+        if workers <= 1:
+            results = list(map(parse_one, indices, pdf_files))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(parse_one, indices, pdf_files))
         
         print(f"\n批量解析完成，共处理 {len(results)} 个文件")
         return results
@@ -377,18 +435,11 @@ class PDFParser:
         Returns:
             str: 文本摘要
         """
-        # 移除图片
-        text = re.sub(r'!\[.*?\]\(.*?\)', '', markdown_content)
-        # 移除标题标记
-        text = re.sub(r'#{1,6}\s+', '', text)
-        # 移除粗体标记
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-        # 移除斜体标记
-        text = re.sub(r'\*(.*?)\*', r'\1', text)
-        # 移除代码标记
-        text = re.sub(r'`(.*?)`', r'\1', text)
-        # 替换换行为空格
-        text = re.sub(r'\n+', ' ', text)
+        # 依次移除图片、标题、粗体、斜体、代码标记，并将换行替换为空格
+        text = markdown_content
+        for marker, pattern, repl in self._SUMMARY_SUBS:
+            if marker in text:
+                text = pattern.sub(repl, text)
         text = text.strip()
         
         if len(text) <= max_length:
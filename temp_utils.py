@@ -6,10 +6,17 @@
 """
 
 import os
+import shutil
+import threading
 from datetime import datetime
 from typing import Optional
 
 
+# 本进程内已确保存在的临时目录，清理目录时同步移除
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
 def get_project_temp_dir(sub_dir: Optional[str] = None) -> str:
     """
     获取项目临时目录路径
@@ -31,8 +38,12 @@ def get_project_temp_dir(sub_dir: Optional[str] = None) -> str:
     else:
         temp_dir = temp_base
     
-    # 确保目录存在
+    # 确保目录存在，已创建过的目录不再重复调用makedirs
+    if temp_dir in _ensured:
+        return temp_dir
     os.makedirs(temp_dir, exist_ok=True)
+    with _ensured_lock:
+        _ensured.add(temp_dir)
     
     return temp_dir
 
@@ -96,7 +107,13 @@ def cleanup_temp_dir(temp_dir: str):
     Args:
         temp_dir: 要清理的临时目录路径
     """
-    import shutil
+    # 目录及其子目录被删除后需重新创建
+    removed = os.path.abspath(temp_dir)
+    with _ensured_lock:
+        _ensured.difference_update(
+            [d for d in _ensured if d == removed or d.startswith(removed + os.sep)]
+        )
+    
     try:
         if os.path.exists(temp_dir):
             shutil.rmtree(temp_dir, ignore_errors=True)
@@ -5,13 +5,17 @@
 专注于保持源文件格式的模板变量替换
 """
 
+import io
 import os
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 from docx import Document
 from docx.shared import Cm
 from docxtpl import DocxTemplate, InlineImage
+from jinja2 import Environment
 
 try:
     from minio_uploader import MinioUploader
@@ -19,9 +23,72 @@ except ImportError:
     MinioUploader = None
 
 
+class _CachingEnvironment(Environment):
+    """按源码缓存编译结果的Jinja环境，同一模板重复渲染时跳过模板解析和编译"""
+
+    @lru_cache(maxsize=32)
+    def _compile_cached(self, source: str):
+        return super().from_string(source)
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals is None and template_class is None and isinstance(source, str):
+            return self._compile_cached(source)
+        return super().from_string(source, globals, template_class)
+
+
+# 所有合并器共享的Jinja环境，docxtpl渲染时传入以复用编译好的模板
+_JINJA_ENV = _CachingEnvironment()
+
+# 模板文件内容缓存: {绝对路径: (mtime, 文件内容)}
+_TEMPLATE_CACHE: Dict[str, Tuple[float, bytes]] = {}
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+
+def _load_template_bytes(template_path: str) -> bytes:
+    """读取模板文件内容，文件未修改时直接返回缓存"""
+    key = os.path.realpath(template_path)
+    mtime = os.path.getmtime(key)
+    cached = _TEMPLATE_CACHE.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(key, 'rb') as f:
+        data = f.read()
+    with _TEMPLATE_CACHE_LOCK:
+        _TEMPLATE_CACHE[key] = (mtime, data)
+    return data
+
+
+# 模板变量缓存: {绝对路径: (mtime, 排序后的变量名列表)}
+_TEMPLATE_VARS_CACHE: Dict[str, Tuple[float, List[str]]] = {}
+
+
+def _load_template_variables(template_path: str) -> List[str]:
+    """解析模板中未声明的变量，文件未修改时直接返回缓存"""
+    key = os.path.realpath(template_path)
+    mtime = os.path.getmtime(key)
+    cached = _TEMPLATE_VARS_CACHE.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    doc = DocxTemplate(io.BytesIO(_load_template_bytes(key)))
+    variables = sorted(doc.get_undeclared_template_variables())
+    with _TEMPLATE_CACHE_LOCK:
+        _TEMPLATE_VARS_CACHE[key] = (mtime, variables)
+    return variables
+
+
 class CoreTemplateMerger:
     """核心模板合并器类，专注于格式保持的变量替换"""
     
+    # 并发读取图片文件的最大线程数
+    MAX_IMAGE_READ_WORKERS = 8
+    
+    # 带类型变量的处理方法: {type: 方法名}，未列出的类型作为文本处理
+    _VARIABLE_HANDLERS = {
+        'sub_doc': '_build_sub_doc',
+        'image': '_build_image',
+        'image_array': '_build_image_array',
+    }
+    
     def __init__(self, template_path: str = "template.docx", config=None):
         """
         初始化模板合并器
@@ -32,7 +99,6 @@ class CoreTemplateMerger:
         """
         self.template_path = template_path
         self.config = config
-        self.variable_pattern = re.compile(r'\{\{(\w+)\}\}')
     
     def merge_template(self, variables: Dict[str, any], output_path: str = None, create_date_folder: bool = True, upload_to_minio: bool = None) -> str:
         """
@@ -66,8 +132,8 @@ class CoreTemplateMerger:
                 output_path = filename
         
         try:
-            # 加载模板文档
-            doc = DocxTemplate(self.template_path)
+            # 加载模板文档，模板内容按修改时间缓存，避免每次合并重复读取文件
+            doc = DocxTemplate(io.BytesIO(_load_template_bytes(self.template_path)))
 
             self._replace_sub_document(doc, variables)
 
@@ -107,24 +173,33 @@ class CoreTemplateMerger:
         processed_variables = {}
         
         for var_name, var_value in variables.items():
-            # 检查变量类型
+            # 检查变量类型，按类型查表分发
             if isinstance(var_value, dict) and 'type' in var_value:
-                if var_value['type'] == 'sub_doc':
-                    processed_variables[var_name] = doc.new_subdoc(var_value['value'])
-                elif var_value['type'] == 'image':
-                    width = var_value.get('width', 20)
-                    processed_variables[var_name] = InlineImage(doc, var_value['value'], width=Cm(width))
-                elif var_value['type'] == 'image_array' and isinstance(var_value['value'], list):
-                    width = var_value.get('width', 20)
-                    processed_variables[var_name] = self._process_image_array(doc, var_value['value'], width)
+                handler = self._VARIABLE_HANDLERS.get(var_value['type'])
+                if handler:
+                    processed_variables[var_name] = getattr(self, handler)(doc, var_value)
                 else:
                     # 其他类型，作为文本处理
                     processed_variables[var_name] = str(var_value.get('value', var_value))
             else:
-                # 简单字符串变量
-                processed_variables[var_name] = str(var_value)
+                # 简单字符串变量，已是字符串时无需转换
+                processed_variables[var_name] = var_value if type(var_value) is str else str(var_value)
         
-        doc.render(processed_variables)
+        doc.render(processed_variables, jinja_env=_JINJA_ENV)
+
+    def _build_sub_doc(self, doc: DocxTemplate, var_value: Dict[str, Any]):
+        """sub_doc类型：插入子文档"""
+        return doc.new_subdoc(var_value['value'])
+
+    def _build_image(self, doc: DocxTemplate, var_value: Dict[str, Any]):
+        """image类型：插入单张图片"""
+        return InlineImage(doc, var_value['value'], width=Cm(var_value.get('width', 20)))
+
+    def _build_image_array(self, doc: DocxTemplate, var_value: Dict[str, Any]):
+        """image_array类型：插入图片数组，值不是列表时作为文本处理"""
+        if not isinstance(var_value['value'], list):
+            return str(var_value.get('value', var_value))
+        return self._process_image_array(doc, var_value['value'], var_value.get('width', 20))
 
     def _process_image_array(self, doc: DocxTemplate, image_paths: list, width: float):
         """
@@ -141,19 +216,22 @@ class CoreTemplateMerger:
             if not image_paths:
                 return []
             
+            # 并发读取图片内容，渲染时直接从内存写入文档，不再逐个打开文件
+            workers = min(self.MAX_IMAGE_READ_WORKERS, len(image_paths))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                image_data_list = list(executor.map(self._read_image, image_paths))
+            
             # 转换为InlineImage数组
             inline_images = []
-            for image_path in image_paths:
-                if os.path.exists(image_path):
-                    try:
-                        # 创建InlineImage对象，设置合适的宽度
-                        inline_image = InlineImage(doc, image_path, width=Cm(width))
-                        inline_images.append(inline_image)
-                    except Exception as e:
-                        print(f"创建InlineImage失败 {image_path}: {e}")
-                        continue
-                else:
-                    print(f"图片文件不存在: {image_path}")
+            for image_path, image_data in zip(image_paths, image_data_list):
+                if image_data is None:
+                    continue
+                try:
+                    # 创建InlineImage对象，设置合适的宽度
+                    inline_image = InlineImage(doc, io.BytesIO(image_data), width=Cm(width))
+                    inline_images.append(inline_image)
+                except Exception as e:
+                    print(f"创建InlineImage失败 {image_path}: {e}")
                     continue
             
             # 如果只有一张图片，返回单个对象（兼容旧行为）
@@ -167,6 +245,19 @@ class CoreTemplateMerger:
             print(f"处理图片数组失败: {e}")
             return []
 
+    @staticmethod
+    def _read_image(image_path: str):
+        """读取图片文件内容，文件不存在或无法读取时返回None"""
+        try:
+            with open(image_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            print(f"图片文件不存在: {image_path}")
+            return None
+        except OSError as e:
+            print(f"读取图片失败 {image_path}: {e}")
+            return None
+
     def validate_template(self) -> Dict[str, Any]:
         """
         验证模板文件，返回模板信息
@@ -178,16 +269,13 @@ class CoreTemplateMerger:
             return {'error': f"模板文件不存在: {self.template_path}"}
         
         try:
-            doc = DocxTemplate(self.template_path)
-            
-            # 收集所有变量
-            variables_found = doc.get_undeclared_template_variables()
-            
+            # 收集所有变量，模板未修改时复用上次的解析结果
+            variables_found = _load_template_variables(self.template_path)
 
             return {
                 'template_path': self.template_path,
                 'variables_count': len(variables_found),
-                'variables': sorted(list(variables_found))
+                'variables': list(variables_found)
             }
             
         except Exception as e: